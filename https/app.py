@@ -5,12 +5,14 @@ This replaces your main.py to demonstrate routing
 import asyncio
 from router import Router
 from server import handle_client
-from http_objects import Request, Response
+from http_objects import Request, Response, StreamingResponse
+from pagination import paginate, iter_after
 from middleware import logger_middleware, auth_middleware
 
 
 # Create router instance
 app = Router()
+app.enable_batch()  # POST /batch
 
 # In-memory data store for demo
 users_db = [
@@ -38,12 +40,14 @@ def home(request: Request):
             "GET /",
             "GET /users",
             "GET /users/{id}",
+            "GET /users/export",
             "POST /users",
             "PUT /users/{id}",
             "DELETE /users/{id}",
             "GET /posts",
             "GET /posts/{id}",
-            "GET /health"
+            "GET /health",
+            "POST /batch"
         ]
     })
 
@@ -68,15 +72,32 @@ def get_users(request: Request):
     # Check for query parameters
     name_filter = request.get_query_param('name')
     
-    filtered_users = users_db
+    where = None
     if name_filter:
-        filtered_users = [u for u in users_db if name_filter.lower() in u['name'].lower()]
+        needle = name_filter.lower()
+        where = lambda u: needle in u['name'].lower()
     
-    return Response.json({
-        "users": filtered_users,
-        "count": len(filtered_users),
-        "filters": {"name": name_filter} if name_filter else {}
-    })
+    # ?limit= and ?cursor= select a page; users_db is kept sorted by id,
+    # the filter only runs from the cursor until the page is full
+    try:
+        page = paginate(users_db, request, key='id', where=where)
+    except ValueError as e:
+        return Response.error(str(e), 400)
+    
+    result = page.to_dict('users')
+    result["filters"] = {"name": name_filter} if name_filter else {}
+    return Response.json(result)
+
+
+@app.get('/users/export')
+def export_users(request: Request):
+    """Stream all users (after ?cursor=) as a chunked JSON array"""
+    try:
+        users = iter_after(users_db, request.get_query_param('cursor'), key='id')
+    except ValueError as e:
+        return Response.error(str(e), 400)
+    
+    return StreamingResponse.json_array(users, prefix='{"users": ', suffix='}')
 
 
 @app.get('/users/{id}')
@@ -164,14 +185,20 @@ def get_posts(request: Request):
     """Get all posts with optional user filter"""
     user_id = request.get_query_param('user_id')
     
-    filtered_posts = posts_db
+    where = None
     if user_id:
-        filtered_posts = [p for p in posts_db if p['user_id'] == int(user_id)]
+        try:
+            wanted = int(user_id)
+        except ValueError:
+            return Response.error("Query parameter 'user_id' must be an integer", 400)
+        where = lambda p: p['user_id'] == wanted
     
-    return Response.json({
-        "posts": filtered_posts,
-        "count": len(filtered_posts)
-    })
+    try:
+        page = paginate(posts_db, request, key='id', where=where)
+    except ValueError as e:
+        return Response.error(str(e), 400)
+    
+    return Response.json(page.to_dict('posts'))
 
 
 @app.get('/posts/{id}')
@@ -199,17 +226,29 @@ def search(request: Request):
         data = request.json() if request.is_json() else {}
         query = data.get('query', '')
     
-    # Simple search in users and posts
-    user_results = [u for u in users_db if query.lower() in u['name'].lower()]
-    post_results = [p for p in posts_db if query.lower() in p['title'].lower()]
+    # Simple search in users and posts, one page of each;
+    # ?limit= applies per collection, ?users_cursor= / ?posts_cursor= continue them
+    needle = query.lower()
+    try:
+        users = paginate(users_db, request, key='id', cursor_param='users_cursor',
+                         where=lambda u: needle in u['name'].lower())
+        posts = paginate(posts_db, request, key='id', cursor_param='posts_cursor',
+                         where=lambda p: needle in p['title'].lower())
+    except ValueError as e:
+        return Response.error(str(e), 400)
     
     return Response.json({
         "query": query,
         "results": {
-            "users": user_results,
-            "posts": post_results
+            "users": users.items,
+            "posts": posts.items
         },
-        "total": len(user_results) + len(post_results)
+        "count": len(users.items) + len(posts.items),
+        "limit": users.limit,
+        "next_cursors": {
+            "users": users.next_cursor,
+            "posts": posts.next_cursor
+        }
     })
 
 
@@ -0,0 +1,416 @@
+"""
+Async HTTP/1.1 client for outbound webhooks
+
+- keep-alive connection pool per host with per-host and total limits
+- request pipelining over one connection (HttpClient.pipeline)
+- timeouts and retries with exponential backoff
+- WebhookQueue: bounded outbound queue delivering items in JSON batches
+
+Responses are parsed with httptools, like incoming requests.
+
+    client = HttpClient()
+    response = await client.post('http://hooks.local/alert', json={"temp": 41})
+
+    alerts = WebhookQueue(client, 'http://hooks.local/batch')
+    alerts.start()
+    alerts.submit({"device": "esp32-1", "temp": 41})      # from the loop
+    alerts.submit_threadsafe({"device": "esp32-2"})       # from a paho thread
+"""
+import asyncio
+import json as jsonlib
+import random
+import ssl
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from httptools import HttpResponseParser, HttpParserError
+from httpparser import HttpParserMixin
+
+RETRY_STATUSES = (502, 503, 504)
+USER_AGENT = "pyro-client/1.0"
+
+
+class HttpClientError(Exception):
+    """Request failed after all retries"""
+
+
+class ClientResponse:
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def get_header(self, key, default=None):
+        """Get header value (case insensitive)"""
+        for header_key, value in self.headers.items():
+            if header_key.lower() == key.lower():
+                return value
+        return default
+
+    def text(self, encoding='utf-8'):
+        return self.body.decode(encoding)
+
+    def json(self):
+        return jsonlib.loads(self.body)
+
+
+class _ResponseParser(HttpParserMixin):
+    """Collects responses from one connection, in order"""
+    def __init__(self, encoding='utf-8'):
+        self._encoding = encoding
+        self.parser = HttpResponseParser(self)
+        self.completed = deque()
+        self._reset()
+
+    def _reset(self):
+        self._headers = {}
+        self._body = b""
+        self.headers_done = False
+
+    def on_headers_complete(self):
+        self.headers_done = True
+
+    def on_message_complete(self):
+        response = ClientResponse(self.parser.get_status_code(), self._headers, self._body)
+        self.completed.append((response, self.parser.should_keep_alive()))
+        self._reset()
+
+    def feed_eof(self):
+        """Finish a response delimited by connection close"""
+        if self.headers_done:
+            response = ClientResponse(self.parser.get_status_code(), self._headers, self._body)
+            self.completed.append((response, False))
+            self._reset()
+
+
+class Connection:
+    def __init__(self, key: Tuple[str, str, int], reader, writer):
+        self.key = key
+        self.reader = reader
+        self.writer = writer
+        self.parser = _ResponseParser()
+        self.last_used = time.monotonic()
+        self.reusable = True
+        self.reused = False
+
+    async def exchange(self, requests: List[bytes], head: bool = False) -> List[ClientResponse]:
+        """Write all requests at once, then read the same number of responses"""
+        self.writer.write(b"".join(requests))
+        await self.writer.drain()
+
+        responses = []
+        parser = self.parser
+        while len(responses) < len(requests):
+            if head and parser.headers_done:
+                # the parser can't know a HEAD response has no body
+                parser.feed_eof()
+                self.reusable = False
+            while parser.completed and len(responses) < len(requests):
+                response, keep_alive = parser.completed.popleft()
+                responses.append(response)
+                if not keep_alive:
+                    self.reusable = False
+            if len(responses) == len(requests):
+                break
+            data = await self.reader.read(65536)
+            if not data:
+                parser.feed_eof()
+                if not parser.completed:
+                    raise ConnectionError("Connection closed before response was complete")
+                continue
+            parser.parser.feed_data(data)
+        self.last_used = time.monotonic()
+        return responses
+
+    def close(self):
+        self.reusable = False
+        self.writer.close()
+
+
+class HttpClient:
+    """Pooled keep-alive HTTP/1.1 client"""
+    def __init__(self, max_per_host: int = 4, max_total: int = 32, timeout: float = 10.0,
+                 retries: int = 2, backoff: float = 0.2, keepalive_timeout: float = 30.0,
+                 headers: Dict[str, str] = None):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.keepalive_timeout = keepalive_timeout
+        self.default_headers = {"User-Agent": USER_AGENT}
+        self.default_headers.update(headers or {})
+        self._idle: Dict[Tuple[str, str, int], deque] = {}
+        self._host_limits: Dict[Tuple[str, str, int], asyncio.Semaphore] = {}
+        self._total_limit = asyncio.Semaphore(max_total)
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "connections_opened": 0}
+
+    # ---------------------------------------
+    # Public API
+    # ---------------------------------------
+
+    async def request(self, method: str, url: str, headers: Dict[str, str] = None, body=None,
+                      json=None, timeout: float = None, retries: int = None) -> ClientResponse:
+        """Send one request, retrying connection errors, timeouts and 502/503/504.
+
+        Retries apply to every method, so a POST may be delivered twice.
+        """
+        key, target = _split_url(url)
+        payload = self._encode(method, key, target, headers, body, json)
+        responses = await self._send(key, [payload], timeout, retries, head=method.upper() == 'HEAD')
+        return responses[0]
+
+    async def get(self, url: str, **kwargs) -> ClientResponse:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> ClientResponse:
+        return await self.request('POST', url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> ClientResponse:
+        return await self.request('PUT', url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> ClientResponse:
+        return await self.request('DELETE', url, **kwargs)
+
+    async def pipeline(self, requests: List[dict], timeout: float = None,
+                       retries: int = None) -> List[ClientResponse]:
+        """Send several requests to one host over one connection without
+        waiting for each response. Items are dicts with method, url and
+        optional headers/body/json. A failure retries the whole batch."""
+        if not requests:
+            return []
+        key = None
+        payloads = []
+        for item in requests:
+            item_key, target = _split_url(item['url'])
+            if key is not None and item_key != key:
+                raise ValueError("Pipelined requests must go to the same host")
+            key = item_key
+            method = item.get('method', 'GET').upper()
+            if method == 'HEAD':
+                raise ValueError("HEAD requests cannot be pipelined")
+            payloads.append(self._encode(method, key, target, item.get('headers'),
+                                         item.get('body'), item.get('json')))
+        return await self._send(key, payloads, timeout, retries)
+
+    async def close(self):
+        """Close all idle connections"""
+        for connections in self._idle.values():
+            while connections:
+                connections.pop().close()
+
+    # ---------------------------------------
+    # Internals
+    # ---------------------------------------
+
+    def _encode(self, method, key, target, headers, body, json) -> bytes:
+        scheme, host, port = key
+        all_headers = dict(self.default_headers)
+        default_port = 443 if scheme == 'https' else 80
+        all_headers["Host"] = host if port == default_port else f"{host}:{port}"
+        if json is not None:
+            body = jsonlib.dumps(json).encode('utf-8')
+            all_headers["Content-Type"] = "application/json"
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+        body = body or b""
+        all_headers.update(headers or {})
+        if body or method in ('POST', 'PUT', 'PATCH'):
+            all_headers["Content-Length"] = str(len(body))
+
+        head = f"{method.upper()} {target} HTTP/1.1\r\n"
+        for name, value in all_headers.items():
+            head += f"{name}: {value}\r\n"
+        return head.encode('utf-8') + b"\r\n" + body
+
+    async def _send(self, key, payloads: List[bytes], timeout, retries, head: bool = False) -> List[ClientResponse]:
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+        host_limit = self._host_limits.setdefault(key, asyncio.Semaphore(self.max_per_host))
+
+        attempt = 0
+        while True:
+            self.stats["requests"] += 1
+            error = None
+            responses = None
+            reused = False
+            async with host_limit, self._total_limit:
+                connection = None
+                try:
+                    connection = await asyncio.wait_for(self._acquire(key), timeout)
+                    reused = connection.reused
+                    responses = await asyncio.wait_for(connection.exchange(payloads, head), timeout)
+                except (OSError, asyncio.TimeoutError, HttpParserError) as e:
+                    error = e
+                    if connection:
+                        connection.close()
+                    connection = None
+                finally:
+                    if connection:
+                        self._release(connection)
+
+            if responses is not None and responses[-1].status not in RETRY_STATUSES:
+                return responses
+            if attempt >= retries:
+                if responses is not None:
+                    return responses
+                self.stats["failures"] += 1
+                raise HttpClientError(f"{key[0]}://{key[1]}:{key[2]} failed after {attempt + 1} attempts: {error!r}")
+
+            # a keep-alive connection the server already closed is retried immediately
+            stale = reused and isinstance(error, ConnectionError)
+            attempt += 1
+            self.stats["retries"] += 1
+            if not stale:
+                delay = self.backoff * (2 ** (attempt - 1))
+                await asyncio.sleep(delay * (0.5 + random.random() / 2))
+
+    async def _acquire(self, key) -> Connection:
+        idle = self._idle.get(key)
+        now = time.monotonic()
+        while idle:
+            connection = idle.pop()
+            if now - connection.last_used < self.keepalive_timeout and not connection.reader.at_eof():
+                connection.reused = True
+                return connection
+            connection.close()
+
+        scheme, host, port = key
+        ssl_context = ssl.create_default_context() if scheme == 'https' else None
+        reader, writer = await asyncio.open_connection(host, port, ssl=ssl_context)
+        self.stats["connections_opened"] += 1
+        return Connection(key, reader, writer)
+
+    def _release(self, connection: Connection):
+        if connection.reusable:
+            self._idle.setdefault(connection.key, deque()).append(connection)
+        else:
+            connection.close()
+
+
+def _split_url(url: str):
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError(f"Unsupported URL: {url}")
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    target = parts.path or '/'
+    if parts.query:
+        target += '?' + parts.query
+    return (parts.scheme, parts.hostname, port), target
+
+
+class WebhookQueue:
+    """Bounded queue of items POSTed to a webhook as JSON arrays.
+
+    submit() never blocks; when the queue is full the item is dropped and
+    counted. Items are serialized to JSON in submit(), so one that cannot be
+    encoded is rejected there instead of failing its batch; objects with a
+    to_dict() method (e.g. RuleEvent) and UTF-8 bytes payloads are accepted.
+    A batch is sent when `batch_size` items are waiting or `flush_interval`
+    seconds after the first one arrived.
+    """
+    def __init__(self, client: HttpClient, url: str, batch_size: int = 50, flush_interval: float = 1.0,
+                 max_queue: int = 10000, headers: Dict[str, str] = None):
+        self.client = client
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.max_queue = max_queue
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task = None
+        self.stats = {"queued": 0, "delivered": 0, "dropped": 0, "failed": 0, "batches": 0}
+
+    def start(self):
+        """Start the delivery task on the running loop"""
+        self.loop = asyncio.get_running_loop()
+        self._task = self.loop.create_task(self._deliver())
+
+    async def stop(self, flush: bool = True):
+        """Stop delivery, optionally sending what is still queued"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if flush:
+            while not self.queue.empty():
+                await self._send_batch(self._take(self.batch_size))
+
+    def submit(self, item) -> bool:
+        """Queue an item from the event loop thread; False if it was dropped"""
+        try:
+            encoded = jsonlib.dumps(item, default=_json_default)
+        except (TypeError, ValueError) as e:
+            self.stats["failed"] += 1
+            print(f"Webhook item for {self.url} is not JSON serializable: {e}")
+            return False
+        try:
+            self.queue.put_nowait(encoded)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["queued"] += 1
+        return True
+
+    def submit_threadsafe(self, item):
+        """Queue an item from another thread (e.g. a paho callback)"""
+        if self.loop is None:
+            raise RuntimeError("WebhookQueue.start() must be called before submit_threadsafe()")
+        self.loop.call_soon_threadsafe(self.submit, item)
+
+    def _take(self, limit: int) -> list:
+        batch = []
+        while len(batch) < limit and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _deliver(self):
+        while True:
+            try:
+                await self._deliver_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # keep delivering whatever goes wrong with one batch
+                print(f"Webhook delivery loop error for {self.url}: {e}")
+
+    async def _deliver_once(self):
+        batch = [await self.queue.get()]
+        deadline = self.loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+            batch.extend(self._take(self.batch_size - len(batch)))
+        await self._send_batch(batch)
+
+    async def _send_batch(self, batch: list):
+        if not batch:
+            return
+        self.stats["batches"] += 1
+        try:
+            body = "[" + ",".join(batch) + "]"
+            response = await self.client.post(self.url, body=body, headers=self.headers)
+            if response.status >= 400:
+                raise HttpClientError(f"Webhook returned {response.status}")
+            self.stats["delivered"] += len(batch)
+        except Exception as e:
+            self.stats["failed"] += len(batch)
+            print(f"Webhook delivery to {self.url} failed: {e}")
+
+
+def _json_default(value):
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,136 @@
+"""
+Single-process runtime hosting the HTTP server and the MQTT client
+
+Both run on one asyncio event loop, so HTTP handlers can publish to MQTT and
+MQTT handlers can read/write `gateway.state` without locks or IPC.
+
+    gateway = Gateway()
+
+    @gateway.mqtt_route('sensor/temperature')
+    def on_temperature(payload):
+        gateway.state['temperature'] = payload
+
+    @gateway.router.post('/led')
+    def led(request):
+        gateway.publish('device/led', request.json())
+        return Response.json({"queued": True})
+
+    asyncio.run(gateway.run())
+"""
+import asyncio
+import json
+import os
+import sys
+from typing import Callable, Dict, Iterable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'mqtt'))
+
+from router import Router
+from server import handle_client
+from app.aio_client import AsyncMqttClient
+from config.settings import MQTT_BROKER, MQTT_PORT
+
+
+class Gateway:
+    """HTTP router + asyncio MQTT client sharing one event loop"""
+    def __init__(self, router: Router = None, mqtt_dispatch: Callable = None,
+                 subscriptions: Iterable[str] = ('#',), client_id: str = "",
+                 housekeeping: Callable = None):
+        self.router = router or Router()
+        self.mqtt_routes: Dict[str, Callable] = {}
+        self.mqtt_dispatch = mqtt_dispatch
+        self.housekeeping = housekeeping
+        self.subscriptions = list(subscriptions)
+        self.state = {}
+        self.mqtt = AsyncMqttClient(client_id)
+        self.mqtt.client.on_connect = self._on_connect
+        self.mqtt.client.on_message = self._on_message
+        self.server = None
+        self._tasks = set()
+        self._housekeeping_task = None
+
+    def mqtt_route(self, topic: str):
+        """Decorator for MQTT topic handlers (sync or async, called with the decoded payload)"""
+        def decorator(handler):
+            self.mqtt_routes[topic] = handler
+            return handler
+        return decorator
+
+    def publish(self, topic: str, payload=None, qos: int = 0, retain: bool = False):
+        """Publish from any handler; dicts and lists are sent as JSON"""
+        if isinstance(payload, (dict, list)):
+            payload = json.dumps(payload)
+        return self.mqtt.publish(topic, payload, qos, retain)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080,
+                    broker: str = MQTT_BROKER, broker_port: int = MQTT_PORT):
+        """Connect to the broker and start listening for HTTP"""
+        self.server = await asyncio.start_server(
+            lambda r, w: handle_client(r, w, self.router), host, port
+        )
+        port = self.server.sockets[0].getsockname()[1]
+        print(f"🚀 Server running at http://{host}:{port}")
+        if self.housekeeping is not None:
+            self._housekeeping_task = asyncio.get_running_loop().create_task(self._housekeeping_loop())
+        try:
+            await self.mqtt.connect(broker, broker_port)
+            print(f"📡 MQTT connected to {broker}:{broker_port}")
+        except OSError as e:
+            print(f"MQTT connect to {broker}:{broker_port} failed, retrying: {e}")
+
+    async def stop(self):
+        if self._housekeeping_task:
+            self._housekeeping_task.cancel()
+            self._housekeeping_task = None
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        await self.mqtt.disconnect()
+
+    async def run(self, *args, **kwargs):
+        """Start both servers and run until cancelled"""
+        await self.start(*args, **kwargs)
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    def _on_connect(self, client, userdata, flags, rc):
+        print("Connected with result code", rc)
+        for topic in self.subscriptions:
+            client.subscribe(topic)
+
+    def _on_message(self, client, userdata, msg):
+        handler = self.mqtt_routes.get(msg.topic)
+        try:
+            if handler is None:
+                if self.mqtt_dispatch:
+                    self.mqtt_dispatch(msg.topic, msg.payload)
+                else:
+                    print(f"No handler for topic: {msg.topic}")
+                return
+
+            result = handler(msg.payload.decode())
+            if asyncio.iscoroutine(result):
+                # keep a reference so the task isn't collected mid-flight
+                task = asyncio.get_running_loop().create_task(result)
+                task.topic = msg.topic
+                self._tasks.add(task)
+                task.add_done_callback(self._handler_done)
+        except Exception as e:
+            print(f"MQTT handler error on {msg.topic}: {e}")
+
+    async def _housekeeping_loop(self):
+        """Calls `housekeeping` once a second, e.g. app.router.housekeeping"""
+        while True:
+            await asyncio.sleep(1.0)
+            try:
+                self.housekeeping()
+            except Exception as e:
+                print(f"Housekeeping error: {e}")
+
+    def _handler_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"MQTT handler error on {task.topic}: {task.exception()}")
@@ -10,6 +10,7 @@ class Request:
         self.headers = headers
         self.body = body
         self.encoding = encoding
+        self.timer = None  # RequestTimer while slow-request capture is enabled
         
         # Parse URL components
         parsed_url = urlparse(url)
@@ -91,6 +92,7 @@ class Response:
         status_texts = {
             200: "OK",
             201: "Created",
+            304: "Not Modified",
             400: "Bad Request",
             401: "Unauthorized",
             403: "Forbidden",
@@ -128,4 +130,108 @@ class Response:
             status=status,
             headers=headers,
             content_type="application/json"
-        )
\ No newline at end of file
+        )
+
+class StreamingResponse(Response):
+    """Response whose body is an iterable (or async iterable) of chunks.
+
+    Sent with Transfer-Encoding: chunked and no Content-Length, writing each
+    chunk as it is produced so large bodies are never held in memory.
+    """
+    def __init__(self, chunks, status=200, headers=None, content_type="application/octet-stream"):
+        super().__init__(body=chunks, status=status, headers=headers, content_type=content_type)
+
+    def head_bytes(self):
+        """Status line and headers"""
+        self.headers.pop('Content-Length', None)
+        self.headers['Transfer-Encoding'] = 'chunked'
+        self.headers['Connection'] = 'close'
+        status_line = f"HTTP/1.1 {self.status} {self._get_status_text()}\r\n"
+        headers_str = ""
+        for key, value in self.headers.items():
+            headers_str += f"{key}: {value}\r\n"
+        return (status_line + headers_str + "\r\n").encode('utf-8')
+
+    async def iter_chunks(self):
+        """Yield body chunks as bytes, for both sync and async iterables"""
+        if hasattr(self.body, '__aiter__'):
+            async for chunk in self.body:
+                yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+        else:
+            for chunk in self.body:
+                yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+    async def read(self):
+        """Collect the whole body (for in-process callers such as /batch)"""
+        return b"".join([chunk async for chunk in self.iter_chunks()])
+
+    def to_bytes(self):
+        """Whole chunked response at once; only for sync iterables"""
+        if hasattr(self.body, '__aiter__'):
+            raise TypeError("Async streaming bodies must be written with iter_chunks()")
+        parts = [self.head_bytes()]
+        for chunk in self.body:
+            chunk = chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+            if chunk:
+                parts.append(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        parts.append(b"0\r\n\r\n")
+        return b"".join(parts)
+
+    @classmethod
+    def json_array(cls, items, status=200, headers=None, prefix="", suffix=""):
+        """Stream items as a JSON array, optionally wrapped, e.g.
+        prefix='{"users": ', suffix='}'"""
+        return cls(
+            iter_json_array(items, prefix=prefix, suffix=suffix),
+            status=status,
+            headers=headers,
+            content_type="application/json"
+        )
+
+
+def iter_json_array(items, prefix="", suffix="", flush_size=16384):
+    """Encode items one at a time as a JSON array, yielding ~flush_size byte chunks.
+
+    Works with sync and async iterables (returns a generator of the same kind).
+    """
+    if hasattr(items, '__aiter__'):
+        return _aiter_json_array(items, prefix, suffix, flush_size)
+    return _iter_json_array(items, prefix, suffix, flush_size)
+
+
+def _iter_json_array(items, prefix, suffix, flush_size):
+    encode = json.JSONEncoder().encode
+    buffer = [prefix, "["]
+    size = 0
+    for item in items:
+        if size:
+            buffer.append(",")
+        text = encode(item)
+        buffer.append(text)
+        size += len(text) + 1
+        if size >= flush_size:
+            yield "".join(buffer).encode('utf-8')
+            buffer = []
+            size = 1  # keep the comma for the next item
+    buffer.append("]")
+    buffer.append(suffix)
+    yield "".join(buffer).encode('utf-8')
+
+
+async def _aiter_json_array(items, prefix, suffix, flush_size):
+    encode = json.JSONEncoder().encode
+    buffer = [prefix, "["]
+    size = 0
+    async for item in items:
+        if size:
+            buffer.append(",")
+        text = encode(item)
+        buffer.append(text)
+        size += len(text) + 1
+        if size >= flush_size:
+            yield "".join(buffer).encode('utf-8')
+            buffer = []
+            size = 1
+    buffer.append("]")
+    buffer.append(suffix)
+    yield "".join(buffer).encode('utf-8')
@@ -1,6 +1,7 @@
 from httptools import HttpRequestParser
 from httpparser import HttpParserMixin
-from http_objects import Request, Response
+from http_objects import Request, Response, StreamingResponse
+from profiling import RequestTimer
 import asyncio
 
 class RequestHandler(HttpParserMixin):
@@ -16,8 +17,12 @@ class RequestHandler(HttpParserMixin):
         self.router = router
         self.current_request = None
         self.response_sent = asyncio.Event()  # Event to signal response completion
+        self._timing = router is not None and router.slow_requests is not None
+        self.timer = None
 
     def feed_data(self, data):
+        if self._timing and self.timer is None:
+            self.timer = RequestTimer()
         print(f"Feeding data: {data[:50]}...")
         try:
             a=self.parser.feed_data(data)
@@ -29,10 +34,33 @@ class RequestHandler(HttpParserMixin):
 
     def _send_response(self, response):
         response_bytes = response.to_bytes()
+        if self.timer:
+            self.timer.mark('serialize')
         print(f"Sending response: {response_bytes[:50]}...")
         self.writer.write(response_bytes)
         self.response_sent.set()  # Signal that the response has been sent
 
+    async def _stream_response(self, response):
+        """Write a chunked response, waiting for the socket to drain between chunks"""
+        try:
+            self.writer.write(response.head_bytes())
+            async for chunk in response.iter_chunks():
+                if chunk:
+                    self.writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                    await self.writer.drain()
+            self.writer.write(b"0\r\n\r\n")
+        except Exception as e:
+            # headers are already out, so the best we can do is cut the stream
+            print(f"Streaming error: {e}")
+        finally:
+            self.response_sent.set()
+
+    def record_timing(self):
+        """Called once the response is flushed to the socket"""
+        if self.timer and self.current_request:
+            self.timer.mark('write')
+            self.router.slow_requests.record(self.current_request, self.timer)
+
     def on_message_complete(self):
         print("Message complete detected")
         self._message_complete = True
@@ -46,6 +74,9 @@ class RequestHandler(HttpParserMixin):
             body=self._body,
             encoding=self._encoding
         )
+        if self.timer:
+            self.timer.mark('parse')
+            self.current_request.timer = self.timer
         
         print(f"Method: {method}")
         print(f"URL: {url}")
@@ -68,7 +99,10 @@ class RequestHandler(HttpParserMixin):
         try:
             print(f"Dispatching: {self.current_request.method} {self.current_request.path}")
             response = await self.router.dispatch(self.current_request)
-            self._send_response(response)
+            if isinstance(response, StreamingResponse):
+                await self._stream_response(response)
+            else:
+                self._send_response(response)
         except Exception as e:
             print(f"Dispatch error: {e}")
             error_response = Response.error("Internal Server Error", 500)
@@ -0,0 +1,97 @@
+"""
+HTTP routes exposing the MQTT last-value cache
+
+GET /devices/latest?ids=a,b,c      latest readings for several devices
+GET /devices/{device_id}/latest    latest reading for one device
+
+Both routes send an ETag built from the cache sequence number and answer
+If-None-Match with 304. Passing ?wait=<seconds> turns the request into a
+long-poll that returns as soon as a reading newer than the ETag (or ?after=<seq>)
+arrives, or 304 when the wait times out.
+
+Readings without a device id are keyed by topic; since topics contain '/',
+read them through the bulk route, e.g. /devices/latest?ids=sensor/temperature
+"""
+from http_objects import Request, Response
+
+MAX_WAIT_SECONDS = 60.0
+
+
+def register_last_value_routes(router, cache, prefix: str = '/devices'):
+    """Add last-value routes for `cache` to `router`"""
+
+    @router.get(f'{prefix}/latest', name='last_values')
+    async def get_last_values(request: Request):
+        ids = request.get_query_param('ids', '')
+        device_ids = [d for d in ids.split(',') if d]
+        if not device_ids:
+            return Response.error("Query parameter 'ids' is required", 400)
+
+        not_modified = await _wait_if_requested(request, cache, device_ids)
+        if not_modified is not None:
+            return not_modified
+
+        entries = cache.get_many(device_ids)
+        seq = cache.seq_of(device_ids)
+        return Response.json({
+            "devices": {
+                device_id: entry.to_dict() if entry else None
+                for device_id, entry in entries.items()
+            },
+            "seq": seq
+        }, headers={'ETag': _etag(seq)})
+
+    @router.get(f'{prefix}/{{device_id}}/latest', name='last_value')
+    async def get_last_value(request: Request):
+        device_id = request.route_params['device_id']
+
+        not_modified = await _wait_if_requested(request, cache, [device_id])
+        if not_modified is not None:
+            return not_modified
+
+        entry = cache.get(device_id)
+        if entry is None:
+            return Response.error(f"No reading for device {device_id}", 404)
+        return Response.json(entry.to_dict(), headers={'ETag': _etag(entry.seq)})
+
+    return router
+
+
+async def _wait_if_requested(request: Request, cache, device_ids):
+    """Handle If-None-Match / long-poll; returns a 304 response or None"""
+    after = _parse_seq(request.get_query_param('after'))
+    if after is None:
+        after = _parse_seq(request.get_header('If-None-Match'))
+
+    if after is None:
+        return None
+
+    wait = request.get_query_param('wait')
+    if wait:
+        try:
+            timeout = min(max(float(wait), 0.0), MAX_WAIT_SECONDS)
+        except ValueError:
+            return Response.error("Query parameter 'wait' must be a number", 400)
+        if timeout > 0 and await cache.wait_newer(device_ids, after, timeout):
+            return None
+
+    seq = cache.seq_of(device_ids)
+    if seq > after:
+        return None
+    return Response(status=304, headers={'ETag': _etag(seq)})
+
+
+def _etag(seq: int) -> str:
+    return f'"{seq}"'
+
+
+def _parse_seq(value):
+    if value is None:
+        return None
+    value = value.strip()
+    if value.startswith('W/'):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        return None
@@ -0,0 +1,135 @@
+"""
+Cursor-based pagination helpers
+
+Cursors are opaque base64url strings holding the sort key of the last item on
+the previous page, so a page is found with a binary search on a sorted list
+instead of skipping `offset` rows, and stays stable while items are added.
+
+    @app.get('/users')
+    def get_users(request):
+        try:
+            page = paginate(users_db, request, key='id')
+        except ValueError as e:
+            return Response.error(str(e), 400)
+        return Response.json(page.to_dict('users'))
+"""
+import base64
+import itertools
+import json
+from bisect import bisect_right
+from typing import Any, Callable, List, Optional, Union
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+
+
+def encode_cursor(value: Any) -> str:
+    """Opaque cursor for a sort key value"""
+    data = json.dumps(value, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Any:
+    """Sort key value from a cursor; raises ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+
+class Page:
+    """One page of results"""
+    def __init__(self, items: List, next_cursor: Optional[str], limit: int):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.limit = limit
+
+    def to_dict(self, name: str = 'items'):
+        return {
+            name: self.items,
+            "count": len(self.items),
+            "limit": self.limit,
+            "next_cursor": self.next_cursor
+        }
+
+
+def _key_func(key: Union[str, Callable]) -> Callable:
+    if callable(key):
+        return key
+    return lambda item: item[key]
+
+
+def get_limit(request, default: int = DEFAULT_LIMIT, maximum: int = MAX_LIMIT) -> int:
+    """?limit= query parameter, clamped to 1..maximum; raises ValueError if not a number"""
+    value = request.get_query_param('limit')
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("Query parameter 'limit' must be an integer")
+    return max(1, min(limit, maximum))
+
+
+def paginate(items: List, request, key: Union[str, Callable] = 'id',
+             default_limit: int = DEFAULT_LIMIT, max_limit: int = MAX_LIMIT,
+             where: Callable = None, cursor_param: str = 'cursor') -> Page:
+    """Page of `items` (sorted ascending by `key`) after ?cursor=, up to ?limit= items.
+
+    With `where`, only matching items are returned; the scan starts at the
+    cursor and stops once the page is full, so the filter never runs over
+    the whole list. `cursor_param` names the query parameter, for endpoints
+    that page several collections at once.
+    """
+    key_func = _key_func(key)
+    limit = get_limit(request, default_limit, max_limit)
+
+    cursor = request.get_query_param(cursor_param)
+    start = 0
+    if cursor:
+        try:
+            start = bisect_right(items, decode_cursor(cursor), key=key_func)
+        except TypeError:
+            raise ValueError("Invalid cursor")
+
+    if where is None:
+        page_items = items[start:start + limit]
+        has_more = start + limit < len(items)
+    else:
+        page_items = []
+        has_more = False
+        for i in range(start, len(items)):
+            if where(items[i]):
+                if len(page_items) == limit:
+                    has_more = True
+                    break
+                page_items.append(items[i])
+
+    next_cursor = None
+    if has_more and page_items:
+        next_cursor = encode_cursor(key_func(page_items[-1]))
+    return Page(page_items, next_cursor, limit)
+
+
+def iter_after(items, cursor: Optional[str], key: Union[str, Callable] = 'id'):
+    """Yield items with key greater than the cursor, for any iterable sorted by key.
+
+    Useful with StreamingResponse.json_array when the source is a generator.
+    The cursor is decoded and compared with the first item up front, so a bad
+    one (or one of the wrong type) raises ValueError here rather than halfway
+    through a stream.
+    """
+    key_func = _key_func(key)
+    after = decode_cursor(cursor) if cursor else None
+    if after is None:
+        return iter(items)
+    items = iter(items)
+    first = next(items, None)
+    if first is None:
+        return iter(())
+    try:
+        key_func(first) > after
+    except TypeError:
+        raise ValueError("Invalid cursor")
+    return (item for item in itertools.chain([first], items) if key_func(item) > after)
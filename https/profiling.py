@@ -0,0 +1,146 @@
+"""
+On-demand profiling for the HTTP server
+
+- SamplingProfiler: a background thread samples the event loop thread's
+  stack every few milliseconds for a fixed time and aggregates folded stacks
+  (flamegraph.pl / speedscope compatible). Nothing runs when it is stopped.
+- RequestTimer / SlowRequestLog: per-request phase timings (parse,
+  middleware, handler, serialize, write); requests slower than a threshold
+  are kept in a ring buffer. Timers are only created while profiling is
+  enabled on the router, so the disabled cost is one attribute check.
+"""
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+
+class RequestTimer:
+    """Accumulates time per phase since the previous mark"""
+    __slots__ = ('start', 'last', 'phases', 'route')
+
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.route = None
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + (now - self.last)
+        self.last = now
+
+    @property
+    def total(self) -> float:
+        return self.last - self.start
+
+
+class SlowRequestLog:
+    """Ring buffer of requests slower than `threshold_ms`"""
+    def __init__(self, threshold_ms: float = 100.0, capacity: int = 200):
+        self.threshold = threshold_ms / 1000.0
+        self.entries = deque(maxlen=capacity)
+        self.seen = 0
+
+    def record(self, request, timer: RequestTimer):
+        self.seen += 1
+        if timer.total < self.threshold:
+            return
+        self.entries.append({
+            "method": request.method,
+            "path": request.path,
+            "route": timer.route,
+            "total_ms": round(timer.total * 1000, 3),
+            "phases_ms": {phase: round(t * 1000, 3) for phase, t in timer.phases.items()},
+            "timestamp": time.time()
+        })
+
+    def slowest(self, limit: int = 20) -> List[dict]:
+        return sorted(self.entries, key=lambda e: e["total_ms"], reverse=True)[:limit]
+
+
+class SamplingProfiler:
+    """Samples one thread's stack from a background thread"""
+    def __init__(self):
+        self.samples: Dict[str, int] = {}
+        self.sample_count = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float = 10.0, interval: float = 0.005, thread_id: int = None):
+        """Sample `thread_id` (default: calling thread) for `seconds`"""
+        if self.running:
+            raise RuntimeError("Profiler is already running")
+        self.samples = {}
+        self.sample_count = 0
+        self.started_at = time.time()
+        self.stopped_at = None
+        self._stop.clear()
+        target = thread_id if thread_id is not None else threading.get_ident()
+        self._thread = threading.Thread(
+            target=self._run, args=(target, seconds, interval), name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, target: int, seconds: float, interval: float):
+        own_file = os.path.abspath(__file__)
+        deadline = time.monotonic() + seconds
+        samples = self.samples
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                if code.co_filename != own_file:
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            samples[key] = samples.get(key, 0) + 1
+            self.sample_count += 1
+            self._stop.wait(interval)
+        self.stopped_at = time.time()
+
+    def folded(self) -> str:
+        """Folded stacks, one "frame;frame;frame count" per line"""
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(list(self.samples.items())))
+
+    def top(self, limit: int = 30) -> List[dict]:
+        """Functions by samples where they were on top of the stack (self) and anywhere (total)"""
+        own: Dict[str, int] = {}
+        total: Dict[str, int] = {}
+        # the sampler thread may add stacks meanwhile; list() copies in one C call
+        for stack, count in list(self.samples.items()):
+            frames = stack.split(";")
+            own[frames[-1]] = own.get(frames[-1], 0) + count
+            for frame in set(frames):
+                total[frame] = total.get(frame, 0) + count
+        rows = [
+            {"function": name, "self": own.get(name, 0), "total": count}
+            for name, count in total.items()
+        ]
+        rows.sort(key=lambda r: (r["self"], r["total"]), reverse=True)
+        return rows[:limit]
+
+    def to_dict(self, limit: int = 30):
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "samples": self.sample_count,
+            "top": self.top(limit)
+        }
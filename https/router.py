@@ -1,6 +1,10 @@
 import re
+import hmac
+import json
+import asyncio
 from typing import Dict, List, Callable, Optional, Tuple
-from http_objects import Request, Response
+from http_objects import Request, Response, StreamingResponse
+from profiling import SamplingProfiler, SlowRequestLog
 
 
 class Route:
@@ -50,6 +54,8 @@ class Router:
     def __init__(self):
         self.routes: List[Route] = []
         self.middleware: List[Callable] = []
+        self.profiler: Optional[SamplingProfiler] = None
+        self.slow_requests: Optional[SlowRequestLog] = None
     
     def add_route(self, method: str, pattern: str, handler: Callable, name: str = None):
         """Add a single route"""
@@ -110,12 +116,18 @@ class Router:
     
     async def dispatch(self, request: Request) -> Response:
         """Main dispatch method - finds route and calls handler"""
+        timer = request.timer
         # Apply middleware to request
         for middleware in self.middleware:
             try:
                 request = await self._call_middleware(middleware, request)
             except Exception as e:
                 return Response.error(f"Middleware error: {str(e)}", 500)
+            # Middleware can reject a request by returning a response
+            if isinstance(request, Response):
+                return request
+        if timer:
+            timer.mark('middleware')
         
         # Find matching route
         match_result = self.match(request.method, request.path)
@@ -124,6 +136,8 @@ class Router:
             return self._handle_404(request)
         
         route, params = match_result
+        if timer:
+            timer.route = route.pattern
         
         # Add route parameters to request object
         request.route_params = params
@@ -144,6 +158,8 @@ class Router:
                 else:
                     response = Response(str(response))
             
+            if timer:
+                timer.mark('handler')
             return response
             
         except Exception as e:
@@ -166,6 +182,167 @@ class Router:
         """Handle 404 errors"""
         return Response.error(f"Route not found: {request.method} {request.path}", 404)
     
+    def enable_batch(self, pattern: str = '/batch', max_requests: int = 50):
+        """Register a POST route that runs many sub-requests in one round trip.
+
+        Body: {"requests": [{"method": "GET", "path": "/users/1"}, ...],
+               "sequential": false}  (or just the list)
+        Sub-requests go straight to dispatch() as Request objects, inheriting
+        the outer request headers. Unless sequential is set, consecutive
+        GET/HEAD requests run concurrently; other methods run one at a time
+        in order. Returns {"responses": [{"status", "headers", "body"}, ...]}.
+        """
+        async def batch(request: Request):
+            data = request.json()
+            if isinstance(data, list):
+                data = {"requests": data}
+            if not isinstance(data, dict) or not isinstance(data.get('requests'), list):
+                return Response.error("Body must be a JSON list of requests or {\"requests\": [...]}", 400)
+
+            sub_requests = data['requests']
+            if len(sub_requests) > max_requests:
+                return Response.error(f"Too many requests in batch (max {max_requests})", 400)
+
+            results = [None] * len(sub_requests)
+            sequential = bool(data.get('sequential', False))
+            reads = []
+
+            async def flush_reads():
+                responses = await asyncio.gather(*(self._dispatch_batch_item(request, sub_requests[i], pattern) for i in reads))
+                for i, response in zip(reads, responses):
+                    results[i] = response
+                reads.clear()
+
+            for i, item in enumerate(sub_requests):
+                method = str(item.get('method', 'GET')).upper() if isinstance(item, dict) else 'GET'
+                if not sequential and method in ('GET', 'HEAD'):
+                    reads.append(i)
+                    continue
+                await flush_reads()
+                results[i] = await self._dispatch_batch_item(request, item, pattern)
+            await flush_reads()
+
+            return Response.json({"responses": results})
+
+        self.add_route('POST', pattern, batch, name='batch')
+
+    async def _dispatch_batch_item(self, parent: Request, item, batch_pattern: str) -> dict:
+        """Dispatch one batch entry and convert the response to a dict"""
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+            return {"status": 400, "headers": {}, "body": {"error": "Each request needs a 'path'", "status": 400}}
+
+        method = str(item.get('method', 'GET')).upper()
+        path = item['path']
+        if path.split('?', 1)[0] == batch_pattern:
+            return {"status": 400, "headers": {}, "body": {"error": "Nested batch requests are not allowed", "status": 400}}
+
+        item_headers = item.get('headers') or {}
+        if not isinstance(item_headers, dict):
+            return {"status": 400, "headers": {}, "body": {"error": "'headers' must be an object", "status": 400}}
+
+        # the outer body's framing and type don't describe the sub-request body
+        headers = {
+            name: value for name, value in parent.headers.items()
+            if name.lower() not in ('content-length', 'content-type')
+        }
+        headers.update({str(name): str(value) for name, value in item_headers.items()})
+        body = item.get('body')
+        if body is None:
+            body = b""
+        elif isinstance(body, (dict, list)):
+            body = json.dumps(body).encode(parent.encoding)
+            headers['Content-Type'] = 'application/json'
+        else:
+            body = str(body).encode(parent.encoding)
+
+        sub_request = Request(method, path, headers, body, parent.encoding)
+        try:
+            response = await self.dispatch(sub_request)
+        except Exception as e:
+            response = Response.error(f"Internal server error: {str(e)}", 500)
+
+        response_body = response.body
+        if isinstance(response, StreamingResponse):
+            response_body = await response.read()
+            if 'application/json' in response.headers.get('Content-Type', ''):
+                response_body = json.loads(response_body)
+        if isinstance(response_body, bytes):
+            try:
+                response_body = response_body.decode(parent.encoding)
+            except UnicodeDecodeError:
+                response_body = None
+        return {"status": response.status, "headers": dict(response.headers), "body": response_body}
+
+    def enable_profiling(self, prefix: str = '/_admin/profile', token: str = None,
+                         slow_threshold_ms: float = 100.0, capacity: int = 200):
+        """Turn on slow-request capture and register admin profiling routes.
+
+        POST {prefix}/start?seconds=10&interval_ms=5   start the sampling profiler
+        POST {prefix}/stop                             stop it early
+        GET  {prefix}/results?format=json|folded       sampled stacks
+        GET  {prefix}/slow?limit=20                    slowest captured requests
+
+        Routes require an X-Admin-Token header equal to `token`.
+        """
+        if not token:
+            raise ValueError("enable_profiling needs an admin token")
+
+        self.profiler = SamplingProfiler()
+        self.slow_requests = SlowRequestLog(slow_threshold_ms, capacity)
+
+        def is_admin(request: Request) -> bool:
+            supplied = request.get_header('X-Admin-Token', '')
+            return hmac.compare_digest(supplied.encode(), token.encode())
+
+        def forbidden():
+            return Response.error("Admin token required", 403)
+
+        def start(request: Request):
+            if not is_admin(request):
+                return forbidden()
+            try:
+                seconds = min(float(request.get_query_param('seconds', 10)), 300.0)
+                interval = max(float(request.get_query_param('interval_ms', 5)), 1.0) / 1000.0
+            except ValueError:
+                return Response.error("seconds and interval_ms must be numbers", 400)
+            try:
+                # handlers run on the event loop thread, which is the one to sample
+                self.profiler.start(seconds, interval)
+            except RuntimeError as e:
+                return Response.error(str(e), 409)
+            return Response.json({"started": True, "seconds": seconds, "interval_ms": interval * 1000})
+
+        def stop(request: Request):
+            if not is_admin(request):
+                return forbidden()
+            self.profiler.stop()
+            return Response.json(self.profiler.to_dict())
+
+        def results(request: Request):
+            if not is_admin(request):
+                return forbidden()
+            if request.get_query_param('format') == 'folded':
+                return Response(self.profiler.folded())
+            return Response.json(self.profiler.to_dict())
+
+        def slow(request: Request):
+            if not is_admin(request):
+                return forbidden()
+            try:
+                limit = int(request.get_query_param('limit', 20))
+            except ValueError:
+                return Response.error("limit must be an integer", 400)
+            return Response.json({
+                "threshold_ms": self.slow_requests.threshold * 1000,
+                "requests_seen": self.slow_requests.seen,
+                "slowest": self.slow_requests.slowest(limit)
+            })
+
+        self.add_route('POST', f'{prefix}/start', start, name='profile_start')
+        self.add_route('POST', f'{prefix}/stop', stop, name='profile_stop')
+        self.add_route('GET', f'{prefix}/results', results, name='profile_results')
+        self.add_route('GET', f'{prefix}/slow', slow, name='profile_slow')
+
     def list_routes(self):
         """List all registered routes (for debugging)"""
         routes_info = []
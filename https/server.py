@@ -49,6 +49,7 @@ async def handle_client(reader, writer, router=None):
     finally:
         try:
             await writer.drain()
+            handler.record_timing()
             writer.close()
             await writer.wait_closed()
             print(f"🔒 Connection to {addr} closed")
@@ -0,0 +1,35 @@
+"""
+Serve the MQTT last-value cache over HTTP
+
+HTTP server and MQTT client share one event loop (see gateway.py), so the
+MQTT routes fill the cache that the HTTP routes in lastvalue.py read from.
+"""
+import asyncio
+from gateway import Gateway
+from router import default_router as router
+from middleware import logger_middleware
+from middleware import auth_middleware
+from lastvalue import register_last_value_routes
+from app.registry import repartition
+from config.settings import REGISTRY_PATH
+
+# take back devices left in worker directories before app.router opens the registry
+if REGISTRY_PATH:
+    repartition(REGISTRY_PATH, 1)
+
+from app.router import handle_message, housekeeping, last_values
+
+
+async def main():
+    router.add_middleware(logger_middleware)
+    router.add_middleware(auth_middleware)
+    register_last_value_routes(router, last_values)
+
+    gateway = Gateway(router, mqtt_dispatch=handle_message, housekeeping=housekeeping)
+    await gateway.run()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n🛑 Server stopped manually.")
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import paho.mqtt.client as mqtt
+from config.settings import MQTT_BROKER, MQTT_PORT
+
+
+class AsyncMqttClient:
+    """paho client driven by an asyncio event loop instead of loop_forever.
+
+    The socket is watched with add_reader/add_writer and paho's
+    loop_read/loop_write/loop_misc are called from the loop, so every
+    callback (on_connect, on_message, ...) runs on the event loop thread.
+    Only the blocking TCP connect runs in an executor, so an unreachable
+    broker does not stall the loop. Set the usual paho callbacks on `client`.
+    """
+
+    def __init__(self, client_id: str = "", loop: asyncio.AbstractEventLoop = None, **client_kwargs):
+        self.client = mqtt.Client(client_id=client_id, **client_kwargs)
+        self.loop = loop
+        self._misc_task = None
+        self._closing = False
+        self._disconnected = None
+        self._loop_thread = None
+
+        self.client.on_socket_open = self._on_socket_open
+        self.client.on_socket_close = self._on_socket_close
+        self.client.on_socket_register_write = self._on_socket_register_write
+        self.client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    async def connect(self, host: str = MQTT_BROKER, port: int = MQTT_PORT, keepalive: int = 60):
+        """Connect to the broker and start servicing the socket on the loop.
+
+        If the broker is unreachable the error is raised, but the reconnect
+        loop is already running and keeps retrying in the background.
+        """
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        self._closing = False
+        self._disconnected = self.loop.create_future()
+        self._loop_thread = threading.get_ident()
+        try:
+            await self.loop.run_in_executor(None, self.client.connect, host, port, keepalive)
+        finally:
+            self._misc_task = self.loop.create_task(self._misc_loop())
+
+    def subscribe(self, topic, qos: int = 0):
+        return self.client.subscribe(topic, qos)
+
+    def publish(self, topic: str, payload=None, qos: int = 0, retain: bool = False):
+        """Queue a message; it is written when the socket becomes writable"""
+        return self.client.publish(topic, payload, qos, retain)
+
+    async def disconnect(self):
+        """Disconnect cleanly and wait for the socket to close"""
+        self._closing = True
+        if self.client.is_connected():
+            self.client.disconnect()
+            try:
+                await asyncio.wait_for(asyncio.shield(self._disconnected), 5)
+            except asyncio.TimeoutError:
+                pass
+        if self._misc_task:
+            self._misc_task.cancel()
+            self._misc_task = None
+
+    # ---------------------------------------
+    # paho socket callbacks
+    # ---------------------------------------
+
+    # connect/reconnect run in an executor thread and fire these callbacks
+    # there, so loop calls are handed over with call_soon_threadsafe
+
+    def _in_loop(self, callback, *args):
+        if threading.get_ident() == self._loop_thread:
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def _on_socket_open(self, client, userdata, sock):
+        self._in_loop(self.loop.add_reader, sock, self._do_read)
+
+    def _on_socket_close(self, client, userdata, sock):
+        self._in_loop(self._socket_closed, sock)
+
+    def _socket_closed(self, sock):
+        self.loop.remove_reader(sock)
+        self.loop.remove_writer(sock)
+        if self._closing and self._disconnected and not self._disconnected.done():
+            self._disconnected.set_result(None)
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self._in_loop(self.loop.add_writer, sock, self._do_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self._in_loop(self.loop.remove_writer, sock)
+
+    def _do_read(self):
+        self.client.loop_read()
+
+    def _do_write(self):
+        self.client.loop_write()
+
+    async def _misc_loop(self):
+        """Keepalive pings, retries and reconnects"""
+        delay = 1
+        while not self._closing:
+            rc = self.client.loop_misc()
+            if rc == mqtt.MQTT_ERR_NO_CONN and not self._closing:
+                try:
+                    await self.loop.run_in_executor(None, self.client.reconnect)
+                    print("MQTT reconnected")
+                    delay = 1
+                except OSError as e:
+                    print(f"MQTT reconnect failed: {e}")
+                    delay = min(delay * 2, 60)
+            await asyncio.sleep(delay)
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+class CacheEntry:
+    """Latest reading for a single device"""
+    __slots__ = ('device_id', 'topic', 'value', 'timestamp', 'seq')
+
+    def __init__(self, device_id: str, topic: str, value, timestamp: float, seq: int):
+        self.device_id = device_id
+        self.topic = topic
+        self.value = value
+        self.timestamp = timestamp
+        self.seq = seq
+
+    def to_dict(self):
+        return {
+            "device_id": self.device_id,
+            "topic": self.topic,
+            "value": self.value,
+            "timestamp": self.timestamp,
+            "seq": self.seq
+        }
+
+
+class LastValueCache:
+    """Keeps the latest value per device and wakes up long-poll readers.
+
+    Sequence numbers come from one counter shared by all devices, so a device's
+    seq only grows and the max seq over any set of devices changes whenever one
+    of them is updated. That makes it usable as an ETag for bulk reads too.
+    Updates may come from the paho network thread, reads from the asyncio loop.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, CacheEntry] = {}
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def update(self, device_id: str, value, topic: str = None) -> CacheEntry:
+        """Store a new reading for a device - O(1)"""
+        with self._lock:
+            self._seq += 1
+            entry = self._entries.get(device_id)
+            if entry is None:
+                entry = CacheEntry(device_id, topic, value, time.time(), self._seq)
+                self._entries[device_id] = entry
+            else:
+                entry.topic = topic
+                entry.value = value
+                entry.timestamp = time.time()
+                entry.seq = self._seq
+            waiters = self._waiters.pop(device_id, None)
+
+        if waiters:
+            for future in waiters:
+                future.get_loop().call_soon_threadsafe(_wake, future)
+        return entry
+
+    def get(self, device_id: str) -> Optional[CacheEntry]:
+        """Get the latest entry for a device"""
+        return self._entries.get(device_id)
+
+    def get_many(self, device_ids: Iterable[str]) -> Dict[str, Optional[CacheEntry]]:
+        """Get the latest entries for several devices"""
+        entries = self._entries
+        return {device_id: entries.get(device_id) for device_id in device_ids}
+
+    def seq_of(self, device_ids: Iterable[str]) -> int:
+        """Highest sequence number among the given devices (0 if none cached)"""
+        entries = self._entries
+        seq = 0
+        for device_id in device_ids:
+            entry = entries.get(device_id)
+            if entry is not None and entry.seq > seq:
+                seq = entry.seq
+        return seq
+
+    def devices(self) -> List[str]:
+        """List cached device ids"""
+        return list(self._entries)
+
+    async def wait_newer(self, device_ids: Iterable[str], after_seq: int, timeout: float) -> bool:
+        """Wait until any of the devices has a seq newer than after_seq.
+
+        Returns True if a newer value is available, False on timeout.
+        """
+        device_ids = list(device_ids)
+        future = asyncio.get_running_loop().create_future()
+
+        with self._lock:
+            if self.seq_of(device_ids) > after_seq:
+                return True
+            for device_id in device_ids:
+                self._waiters.setdefault(device_id, []).append(future)
+
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            if not future.done():
+                future.cancel()
+            self._discard_waiter(device_ids, future)
+
+    def _discard_waiter(self, device_ids, future):
+        with self._lock:
+            for device_id in device_ids:
+                waiters = self._waiters.get(device_id)
+                if not waiters:
+                    continue
+                try:
+                    waiters.remove(future)
+                except ValueError:
+                    pass
+                if not waiters:
+                    del self._waiters[device_id]
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def parse_reading(topic: str, payload: str):
+    """Extract (device_id, value) from a message.
+
+    JSON payloads may carry a "device_id" (or "device") field; otherwise the
+    topic is used as the device id, which matches single-device setups like
+    the ESP32 example publishing to sensor/temperature.
+    """
+    try:
+        value = json.loads(payload)
+    except ValueError:
+        return topic, payload
+
+    if isinstance(value, dict):
+        device_id = value.get("device_id", value.get("device"))
+        if device_id is not None:
+            return str(device_id), value
+    return topic, value
@@ -0,0 +1,279 @@
+"""
+Duplicate suppression and reordering for QoS 1 telemetry
+
+Messages are keyed by (topic, device, sequence) when the JSON payload carries
+a "seq"/"sequence" field, otherwise by (topic, payload hash). Sequence keys are
+kept for `window` seconds in a time-windowed structure:
+
+- RotatingBloomFilter: two bloom filter generations swapped every `window`
+  seconds (or when the current one is full). Fixed memory, small false
+  positive rate - a false positive drops a genuine message.
+- LRUSet: exact, keeps key digests until they age out or `max_items` is hit.
+
+Payload-hash keys go to a separate LRUSet with a short `hash_window`, sized
+to the QoS 1 retransmit delay: a device repeating the same reading every few
+seconds is not a duplicate, a retransmission follows within a second or two.
+
+An optional per-device ReorderBuffer holds up to `size` out-of-order messages
+and releases them by sequence number.
+"""
+import hashlib
+import heapq
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.cache import parse_reading
+
+LRU_ENTRY_BYTES = 100  # rough per-key cost of an OrderedDict entry with a 16 byte digest
+
+
+def _digest(key: bytes) -> bytes:
+    return hashlib.blake2b(key, digest_size=16).digest()
+
+
+class BloomFilter:
+    """Plain bloom filter over a bytearray"""
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: bytes):
+        digest = _digest(key)
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        bits = self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+
+    def __contains__(self, key: bytes) -> bool:
+        array = self.array
+        return all(array[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key: bytes) -> bool:
+        """Add key; returns True if it was (probably) already present"""
+        array = self.array
+        present = True
+        for p in self._positions(key):
+            mask = 1 << (p & 7)
+            if not array[p >> 3] & mask:
+                present = False
+                array[p >> 3] |= mask
+        if not present:
+            self.count += 1
+        return present
+
+
+class RotatingBloomFilter:
+    """Two bloom filter generations; keys are remembered for `window` to 2x`window` seconds"""
+    def __init__(self, window: float = 60.0, capacity: int = 100_000, error_rate: float = 0.001,
+                 max_bytes: Optional[int] = None):
+        # each key is checked against two generations, so split the error budget
+        per_filter_rate = error_rate / 2
+        if max_bytes is not None:
+            bits = max_bytes * 8 // 2
+            capacity = min(capacity, max(1, int(-bits * (math.log(2) ** 2) / math.log(per_filter_rate))))
+        self.window = window
+        self.capacity = capacity
+        self.error_rate = per_filter_rate
+        self.current = BloomFilter(capacity, per_filter_rate)
+        self.previous = BloomFilter(capacity, per_filter_rate)
+        self._rotate_at = time.monotonic() + window
+
+    def seen(self, key: bytes, now: float = None) -> bool:
+        """Record key; returns True if it was seen within the window"""
+        now = time.monotonic() if now is None else now
+        if now >= self._rotate_at or self.current.count >= self.capacity:
+            self.previous = self.current
+            self.current = BloomFilter(self.capacity, self.error_rate)
+            self._rotate_at = now + self.window
+        if key in self.previous:
+            self.current.add(key)
+            return True
+        return self.current.add(key)
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self.current.array) + len(self.previous.array)
+
+
+class LRUSet:
+    """Exact duplicate set with time and size bounds"""
+    def __init__(self, window: float = 60.0, max_items: int = 100_000, max_bytes: Optional[int] = None):
+        if max_bytes is not None:
+            max_items = min(max_items, max(1, max_bytes // LRU_ENTRY_BYTES))
+        self.window = window
+        self.max_items = max_items
+        self._items: OrderedDict = OrderedDict()
+
+    def seen(self, key: bytes, now: float = None) -> bool:
+        now = time.monotonic() if now is None else now
+        items = self._items
+        cutoff = now - self.window
+        while items:
+            oldest = next(iter(items.values()))
+            if oldest >= cutoff and len(items) < self.max_items:
+                break
+            items.popitem(last=False)
+
+        digest = _digest(key)
+        if digest in items:
+            items.move_to_end(digest)
+            items[digest] = now
+            return True
+        items[digest] = now
+        return False
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._items) * LRU_ENTRY_BYTES
+
+
+class ReorderBuffer:
+    """Per-device buffer that releases messages in sequence order.
+
+    A message is held while an earlier sequence number is missing, until
+    `size` messages are waiting for the device or the oldest has waited
+    `timeout` seconds; then the gap is skipped. Deadlines live in a heap and
+    are re-armed while a device still has messages waiting.
+    """
+    def __init__(self, size: int = 8, timeout: float = 1.0):
+        self.size = size
+        self.timeout = timeout
+        self._next: Dict[str, int] = {}
+        self._pending: Dict[str, list] = {}
+        self._deadlines: List[Tuple[float, str]] = []
+
+    def push(self, device_id: str, seq: int, item, now: float = None) -> list:
+        """Add a message; returns the messages now ready, in order"""
+        now = time.monotonic() if now is None else now
+        expected = self._next.get(device_id)
+        if expected is None or seq == expected:
+            self._next[device_id] = seq + 1
+            return [item] + self._drain(device_id)
+        if seq < expected:
+            # late arrival after its gap was skipped; deliver rather than drop
+            return [item]
+
+        pending = self._pending.setdefault(device_id, [])
+        heapq.heappush(pending, (seq, now, item))
+        heapq.heappush(self._deadlines, (now + self.timeout, device_id))
+        if len(pending) > self.size:
+            return self._skip_gap(device_id)
+        return []
+
+    def expire(self, now: float = None) -> list:
+        """Release messages whose gap has waited longer than the timeout"""
+        now = time.monotonic() if now is None else now
+        ready = []
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, device_id = heapq.heappop(deadlines)
+            # the heap is ordered by sequence, the deadline follows the oldest arrival
+            while self._pending.get(device_id):
+                oldest = min(arrived for _, arrived, _ in self._pending[device_id])
+                if oldest + self.timeout > now:
+                    heapq.heappush(deadlines, (oldest + self.timeout, device_id))
+                    break
+                ready.extend(self._skip_gap(device_id))
+        return ready
+
+    def _skip_gap(self, device_id: str) -> list:
+        seq, _, item = heapq.heappop(self._pending[device_id])
+        self._next[device_id] = seq + 1
+        return [item] + self._drain(device_id)
+
+    def _drain(self, device_id: str) -> list:
+        pending = self._pending.get(device_id)
+        ready = []
+        while pending and pending[0][0] <= self._next[device_id]:
+            seq, _, item = heapq.heappop(pending)
+            if seq == self._next[device_id]:
+                self._next[device_id] = seq + 1
+            ready.append(item)
+        if not pending:
+            self._pending.pop(device_id, None)
+        return ready
+
+
+class Deduplicator:
+    """De-duplication (and optional reordering) stage for the MQTT router.
+
+    `max_bytes` caps both key stores together: it is split evenly between
+    sequence keys and payload hashes when both are in use.
+    """
+    def __init__(self, window: float = 60.0, capacity: int = 100_000, error_rate: float = 0.001,
+                 max_bytes: Optional[int] = None, exact: bool = False,
+                 reorder_size: int = 0, reorder_timeout: float = 1.0, hash_window: float = 2.0):
+        if max_bytes is not None and hash_window:
+            max_bytes //= 2
+        if exact:
+            self.seen_keys = LRUSet(window, capacity, max_bytes)
+        else:
+            self.seen_keys = RotatingBloomFilter(window, capacity, error_rate, max_bytes)
+        # 0 turns payload-hash de-duplication off
+        self.seen_hashes = LRUSet(hash_window, capacity, max_bytes) if hash_window else None
+        self.reorder = ReorderBuffer(reorder_size, reorder_timeout) if reorder_size else None
+        self.passed: Dict[str, int] = {}
+        self.suppressed: Dict[str, int] = {}
+
+    def process(self, topic: str, payload: bytes) -> List[Tuple[str, bytes]]:
+        """Returns the (topic, payload) messages to hand to the handlers"""
+        device_id, seq = _sequence_of(topic, payload)
+        now = time.monotonic()
+        if seq is None:
+            key = topic.encode('utf-8') + b'\0' + payload
+            seen = self.seen_hashes is not None and self.seen_hashes.seen(key, now)
+        else:
+            seen = self.seen_keys.seen(f"{topic}\0{device_id}\0{seq}".encode('utf-8'), now)
+        if seen:
+            self.suppressed[topic] = self.suppressed.get(topic, 0) + 1
+            return self.expire(now)
+        self.passed[topic] = self.passed.get(topic, 0) + 1
+
+        if self.reorder is None:
+            return [(topic, payload)]
+        ready = self.expire(now)
+        if seq is None:
+            ready.append((topic, payload))
+        else:
+            ready.extend(self.reorder.push(f"{topic}\0{device_id}", seq, (topic, payload), now))
+        return ready
+
+    def expire(self, now: float = None) -> List[Tuple[str, bytes]]:
+        """Release reorder-buffered messages whose wait timed out"""
+        if self.reorder is None:
+            return []
+        return self.reorder.expire(now)
+
+    def stats(self):
+        """Suppressed counts and retransmission rate per topic"""
+        topics = {}
+        for topic in set(self.passed) | set(self.suppressed):
+            passed = self.passed.get(topic, 0)
+            suppressed = self.suppressed.get(topic, 0)
+            topics[topic] = {
+                "passed": passed,
+                "suppressed": suppressed,
+                "retransmission_rate": suppressed / (passed + suppressed)
+            }
+        memory = self.seen_keys.memory_bytes
+        if self.seen_hashes is not None:
+            memory += self.seen_hashes.memory_bytes
+        return {"topics": topics, "memory_bytes": memory}
+
+
+def _sequence_of(topic: str, payload: bytes):
+    """(device_id, seq) from a JSON payload, seq is None if absent"""
+    try:
+        device_id, value = parse_reading(topic, payload.decode('utf-8'))
+    except UnicodeDecodeError:
+        return topic, None
+    if isinstance(value, dict):
+        seq = value.get("seq", value.get("sequence"))
+        if isinstance(seq, int):
+            return device_id, seq
+    return device_id, None
@@ -0,0 +1,3 @@
+def handle_rule_event(event):
+    state = "TRIGGERED" if event.active else "cleared"
+    print(f"Rule {event.rule.name} {state} for {event.device_id}: {event.rule.type} of {event.rule.field} = {event.value}")
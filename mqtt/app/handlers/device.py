@@ -1,2 +1,32 @@
+import json
+from app.registry import DeviceRegistry
+from config.settings import REGISTRY_PATH, DEVICE_OFFLINE_AFTER, REGISTRY_SNAPSHOT_INTERVAL
+
+registry = DeviceRegistry(
+    REGISTRY_PATH,
+    offline_after=DEVICE_OFFLINE_AFTER,
+    snapshot_interval=REGISTRY_SNAPSHOT_INTERVAL
+).load()
+
 def register_device(payload):
-    print("Registering device with data:", payload)
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        print("Invalid device registration payload:", payload)
+        return
+
+    device_id = data.get("device_id", data.get("device")) if isinstance(data, dict) else None
+    if device_id is None:
+        print("Device registration without device_id:", payload)
+        return
+
+    meta = {k: v for k, v in data.items() if k not in ("device_id", "device", "type", "firmware", "group")}
+    device = registry.register(
+        str(device_id),
+        type=data.get("type"),
+        firmware=data.get("firmware"),
+        group=data.get("group"),
+        meta=meta
+    )
+    registry.touch(device.device_id)
+    print("Registered device:", device.device_id)
@@ -1,5 +1,6 @@
+import time
 import paho.mqtt.client as mqtt
-from app.router import handle_message
+from app.router import handle_message, housekeeping
 from config.settings import MQTT_BROKER, MQTT_PORT
 
 def on_connect(client, userdata, flags, rc):
@@ -9,9 +10,40 @@ def on_connect(client, userdata, flags, rc):
 def on_message(client, userdata, msg):
     handle_message(msg.topic, msg.payload)
 
+def run_client_loop(client, every_second=None, every_loop=None, timeout=1.0, name="MQTT"):
+    """Run the paho network loop in this thread, reconnecting on errors and
+    calling housekeeping() (and `every_second`, if given) once a second;
+    `every_loop` runs after each network loop pass, at least every `timeout`"""
+    next_tick = time.monotonic()
+    while True:
+        rc = client.loop(timeout=timeout)
+        if every_loop is not None:
+            every_loop()
+        if rc != mqtt.MQTT_ERR_SUCCESS:
+            print(f"{name} connection lost ({rc}), reconnecting")
+            time.sleep(1)
+            try:
+                client.reconnect()
+            except OSError as e:
+                print(f"{name} reconnect failed: {e}")
+
+        if time.monotonic() >= next_tick:
+            next_tick = time.monotonic() + 1.0
+            try:
+                housekeeping()
+            except Exception as e:
+                print(f"{name} housekeeping error: {e}")
+            if every_second is not None:
+                every_second()
+
 def run_mqtt_server():
     client = mqtt.Client()
     client.on_connect = on_connect
     client.on_message = on_message
     client.connect(MQTT_BROKER, MQTT_PORT, 60)
-    client.loop_forever()
+    try:
+        run_client_loop(client)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.disconnect()
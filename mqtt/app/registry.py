@@ -0,0 +1,384 @@
+"""
+Device registry
+
+- O(1) lookup by device id, secondary indexes by type / firmware / group
+- touch() on every message only stores a timestamp; online devices are not
+  rescheduled, the timer wheel re-checks last_seen lazily when their slot fires
+- tick() is driven by a timer (the MQTT loop or the gateway), so silent
+  devices go offline and snapshots are taken even when no messages arrive
+- persistence is a compact snapshot (one JSON array per device) plus an
+  append-only log of registrations since the snapshot; load() reads the
+  snapshot and replays the log. Periodic snapshots are written from a
+  background thread so the message path never waits on the disk
+"""
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+INDEXED_FIELDS = ('type', 'firmware', 'group')
+
+
+class Device:
+    """A registered device"""
+    __slots__ = ('device_id', 'type', 'firmware', 'group', 'meta', 'last_seen', 'online')
+
+    def __init__(self, device_id: str, type: str = None, firmware: str = None, group: str = None,
+                 meta: dict = None, last_seen: float = 0.0):
+        self.device_id = device_id
+        self.type = type
+        self.firmware = firmware
+        self.group = group
+        self.meta = meta or {}
+        self.last_seen = last_seen
+        self.online = False
+
+    def to_dict(self):
+        return {
+            "device_id": self.device_id,
+            "type": self.type,
+            "firmware": self.firmware,
+            "group": self.group,
+            "meta": self.meta,
+            "last_seen": self.last_seen,
+            "online": self.online
+        }
+
+    def to_row(self) -> list:
+        return [self.device_id, self.type, self.firmware, self.group, self.last_seen, self.meta]
+
+    @classmethod
+    def from_row(cls, row: list) -> 'Device':
+        device_id, type, firmware, group, last_seen, meta = row
+        return cls(device_id, type, firmware, group, meta, last_seen)
+
+
+class TimerWheel:
+    """Hashed timer wheel: O(1) schedule, expiry processed one slot per tick.
+
+    Deadlines further out than the wheel span land in the last slot and are
+    expected to be rescheduled by the caller when they fire early.
+    """
+    def __init__(self, tick: float = 1.0, slots: int = 512, now: float = None):
+        now = time.time() if now is None else now
+        self.tick = tick
+        self.slots = slots
+        self.buckets: List[Set[str]] = [set() for _ in range(slots)]
+        self.current = int(now / tick)
+
+    def schedule(self, key: str, when: float):
+        target = max(int(when / self.tick), self.current + 1)
+        target = min(target, self.current + self.slots - 1)
+        self.buckets[target % self.slots].add(key)
+
+    def advance(self, now: float) -> List[str]:
+        """Move to `now`; returns keys from every slot passed"""
+        target = int(now / self.tick)
+        if target <= self.current:
+            return []
+        steps = min(target - self.current, self.slots)
+        due = []
+        for step in range(1, steps + 1):
+            bucket = self.buckets[(self.current + step) % self.slots]
+            if bucket:
+                due.extend(bucket)
+                bucket.clear()
+        self.current = target
+        return due
+
+
+class DeviceRegistry:
+    """Registered devices with indexes, online tracking and persistence"""
+    def __init__(self, path: str = None, offline_after: float = 300.0, tick: float = 1.0,
+                 snapshot_interval: float = 600.0):
+        self.path = path
+        self.offline_after = offline_after
+        self.snapshot_interval = snapshot_interval
+        self.devices: Dict[str, Device] = {}
+        self.indexes: Dict[str, Dict[str, Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+        self.wheel = TimerWheel(tick, max(8, int(offline_after / tick) + 2))
+        self.on_online: List[Callable[[Device], None]] = []
+        self.on_offline: List[Callable[[Device], None]] = []
+        self._next_snapshot = time.time() + snapshot_interval
+        self._log = None
+        self._snapshot_thread = None
+
+    # ---------------------------------------
+    # Registration and lookup
+    # ---------------------------------------
+
+    def register(self, device_id: str, type: str = None, firmware: str = None, group: str = None,
+                 meta: dict = None, log: bool = True) -> Device:
+        """Add or update a device"""
+        device = self.devices.get(device_id)
+        if device is None:
+            device = Device(device_id)
+            self.devices[device_id] = device
+        else:
+            self._unindex(device)
+
+        device.type = type
+        device.firmware = firmware
+        device.group = group
+        device.meta = meta or {}
+        self._index(device)
+
+        if log:
+            self._append_log(device.to_row())
+        return device
+
+    def get(self, device_id: str) -> Optional[Device]:
+        return self.devices.get(device_id)
+
+    def find(self, **filters) -> List[Device]:
+        """Devices matching all filters, e.g. find(type='esp32', group='lab')"""
+        ids = None
+        for field, value in filters.items():
+            if field not in self.indexes:
+                raise ValueError(f"Field '{field}' is not indexed")
+            matches = self.indexes[field].get(value, set())
+            ids = set(matches) if ids is None else ids & matches
+            if not ids:
+                return []
+        if ids is None:
+            return list(self.devices.values())
+        return [self.devices[device_id] for device_id in ids]
+
+    def online(self) -> List[Device]:
+        return [device for device in self.devices.values() if device.online]
+
+    def _index(self, device: Device):
+        for field in INDEXED_FIELDS:
+            value = getattr(device, field)
+            if value is not None:
+                self.indexes[field].setdefault(value, set()).add(device.device_id)
+
+    def _unindex(self, device: Device):
+        for field in INDEXED_FIELDS:
+            value = getattr(device, field)
+            ids = self.indexes[field].get(value)
+            if ids is not None:
+                ids.discard(device.device_id)
+                if not ids:
+                    del self.indexes[field][value]
+
+    # ---------------------------------------
+    # Last-seen tracking
+    # ---------------------------------------
+
+    def touch(self, device_id: str, now: float = None) -> bool:
+        """Record activity for a device; returns False for unknown devices"""
+        device = self.devices.get(device_id)
+        if device is None:
+            return False
+        now = time.time() if now is None else now
+        device.last_seen = now
+        if not device.online:
+            device.online = True
+            self.wheel.schedule(device_id, now + self.offline_after)
+            for callback in self.on_online:
+                callback(device)
+        return True
+
+    def tick(self, now: float = None):
+        """Mark silent devices offline and start periodic snapshots.
+
+        Call this about once per `tick` seconds from a timer.
+        """
+        now = time.time() if now is None else now
+        for device_id in self.wheel.advance(now):
+            device = self.devices.get(device_id)
+            if device is None or not device.online:
+                continue
+            deadline = device.last_seen + self.offline_after
+            if deadline > now:
+                self.wheel.schedule(device_id, deadline)
+                continue
+            device.online = False
+            for callback in self.on_offline:
+                callback(device)
+
+        if self.path and now >= self._next_snapshot and not self.snapshotting:
+            self.snapshot(background=True)
+
+    # ---------------------------------------
+    # Persistence
+    # ---------------------------------------
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.path, 'devices.snapshot')
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.path, 'devices.log')
+
+    @property
+    def prev_log_path(self) -> str:
+        return os.path.join(self.path, 'devices.log.prev')
+
+    @property
+    def snapshotting(self) -> bool:
+        return self._snapshot_thread is not None and self._snapshot_thread.is_alive()
+
+    def _append_log(self, row: list):
+        if not self.path:
+            return
+        if self._log is None:
+            os.makedirs(self.path, exist_ok=True)
+            self._log = open(self.log_path, 'a', encoding='utf-8')
+        self._log.write(json.dumps(row, separators=(',', ':')) + '\n')
+        self._log.flush()
+
+    def snapshot(self, background: bool = False):
+        """Write all devices to a new snapshot and start an empty log.
+
+        The current log is moved to devices.log.prev and only removed once
+        the new snapshot is in place, so a crash at any point loses nothing.
+        With background=True the file is written from a thread.
+        """
+        if not self.path or self.snapshotting:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        devices = list(self.devices.values())
+        self._rotate_log()
+        self._next_snapshot = time.time() + self.snapshot_interval
+        if background:
+            self._snapshot_thread = threading.Thread(
+                target=self._write_snapshot, args=(devices,), name="registry-snapshot", daemon=True
+            )
+            self._snapshot_thread.start()
+        else:
+            self._write_snapshot(devices)
+
+    def _rotate_log(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if not os.path.exists(self.log_path):
+            return
+        if os.path.exists(self.prev_log_path):
+            # an earlier snapshot failed; its rows are still needed
+            with open(self.prev_log_path, 'a', encoding='utf-8') as prev, \
+                    open(self.log_path, encoding='utf-8') as log:
+                prev.write(log.read())
+            os.remove(self.log_path)
+        else:
+            os.replace(self.log_path, self.prev_log_path)
+
+    def _write_snapshot(self, devices: List[Device]):
+        tmp_path = self.snapshot_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for device in devices:
+                    f.write(json.dumps(device.to_row(), separators=(',', ':')) + '\n')
+            os.replace(tmp_path, self.snapshot_path)
+            if os.path.exists(self.prev_log_path):
+                os.remove(self.prev_log_path)
+        except OSError as e:
+            print(f"Registry snapshot failed: {e}")
+
+    def load(self):
+        """Load the snapshot and replay the logs"""
+        if not self.path:
+            return self
+        for file_path in (self.snapshot_path, self.prev_log_path, self.log_path):
+            for row in _read_rows(file_path):
+                device = Device.from_row(row)
+                previous = self.devices.get(device.device_id)
+                if previous is not None:
+                    self._unindex(previous)
+                    device.last_seen = max(device.last_seen, previous.last_seen)
+                self.devices[device.device_id] = device
+                self._index(device)
+        return self
+
+    def reopen(self, path: str):
+        """Switch to another directory, dropping the devices loaded so far"""
+        self.close()
+        self.path = path
+        self.devices = {}
+        self.indexes = {field: {} for field in INDEXED_FIELDS}
+        self.wheel = TimerWheel(self.wheel.tick, self.wheel.slots)
+        return self.load()
+
+    def close(self):
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+            self._snapshot_thread = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+def registry_dir(path: str, index: int, workers: int) -> str:
+    """Directory of worker `index`'s registry; a single process uses `path` itself"""
+    return path if workers == 1 else os.path.join(path, f"worker-{index}")
+
+
+def repartition(path: str, workers: int, owner_of: Callable[[str], int] = None):
+    """Move every device to the registry directory of the worker that owns it.
+
+    Devices are merged from `path` and all worker-<n> directories (the most
+    recently seen copy wins) and written as one snapshot per worker. The
+    worker count is recorded in `path`/workers, so this is a no-op until it
+    changes. Run it before any registry is opened on `path`.
+    """
+    layout_path = os.path.join(path, 'workers')
+    try:
+        with open(layout_path, encoding='utf-8') as f:
+            if int(f.read()) == workers:
+                return
+    except (OSError, ValueError):
+        pass
+    os.makedirs(path, exist_ok=True)
+
+    sources = [path] + [
+        os.path.join(path, name) for name in sorted(os.listdir(path))
+        if name.startswith('worker-') and os.path.isdir(os.path.join(path, name))
+    ]
+    merged: Dict[str, Device] = {}
+    for source in sources:
+        for device in DeviceRegistry(source).load().devices.values():
+            previous = merged.get(device.device_id)
+            if previous is None or device.last_seen >= previous.last_seen:
+                merged[device.device_id] = device
+
+    targets = [DeviceRegistry(registry_dir(path, index, workers)) for index in range(workers)]
+    for device_id, device in merged.items():
+        target = targets[owner_of(device_id) if workers > 1 else 0]
+        target.devices[device_id] = device
+    for target in targets:
+        target.snapshot()
+        target.close()
+
+    target_paths = {target.path for target in targets}
+    for source in sources:
+        if source in target_paths:
+            continue
+        for name in ('devices.snapshot', 'devices.log', 'devices.log.prev'):
+            file_path = os.path.join(source, name)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        if source != path and not os.listdir(source):
+            os.rmdir(source)
+
+    with open(layout_path, 'w', encoding='utf-8') as f:
+        f.write(str(workers))
+    print(f"Device registry: {len(merged)} devices split across {workers} worker(s)")
+
+
+def _read_rows(file_path: str) -> Iterable[list]:
+    if not os.path.exists(file_path):
+        return
+    with open(file_path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # torn write at the end of the log
+                print(f"Skipping corrupt registry line in {file_path}")
@@ -1,4 +1,9 @@
-from app.handlers import device, sensor
+import time
+from app.handlers import alerts, device, sensor
+from app.cache import LastValueCache, parse_reading
+from app.dedup import Deduplicator
+from app.rules import RuleEngine
+from config import settings
 
 ROUTES = {
     "device/register": device.register_device,
@@ -7,10 +12,80 @@ ROUTES = {
 
 }
 
+# Topics whose latest reading per device is kept for HTTP reads
+CACHED_TOPICS = {
+    "sensor/temperature",
+}
+
+last_values = LastValueCache()
+
+# Alert rules evaluated on readings per topic, configured in settings.MQTT_RULES
+rule_engines = {
+    topic: RuleEngine(
+        rules,
+        handlers=[alerts.handle_rule_event],
+        batch_size=settings.MQTT_RULE_BATCH_SIZE,
+        max_delay=settings.MQTT_RULE_MAX_DELAY
+    )
+    for topic, rules in settings.MQTT_RULES.items()
+}
+
+dedup = None
+if settings.MQTT_DEDUP:
+    dedup = Deduplicator(
+        window=settings.MQTT_DEDUP_WINDOW,
+        capacity=settings.MQTT_DEDUP_CAPACITY,
+        error_rate=settings.MQTT_DEDUP_ERROR_RATE,
+        max_bytes=settings.MQTT_DEDUP_MAX_BYTES,
+        exact=settings.MQTT_DEDUP_EXACT,
+        reorder_size=settings.MQTT_REORDER_SIZE,
+        reorder_timeout=settings.MQTT_REORDER_TIMEOUT,
+        hash_window=settings.MQTT_DEDUP_HASH_WINDOW
+    )
+
+_next_dedup_report = time.monotonic() + settings.MQTT_DEDUP_REPORT_INTERVAL
+
+def report_dedup():
+    """Log suppressed counts and retransmission rate per topic"""
+    stats = dedup.stats()
+    topics = ", ".join(
+        f"{topic} {s['suppressed']}/{s['passed'] + s['suppressed']} ({s['retransmission_rate']:.1%})"
+        for topic, s in sorted(stats["topics"].items())
+    )
+    print(f"📊 dedup suppressed: {topics or 'no messages'}; {stats['memory_bytes']} bytes")
+
+def housekeeping(now=None):
+    """Timer work that must run even when no messages arrive (about once a second)"""
+    device.registry.tick(now)
+    for engine in rule_engines.values():
+        engine.flush_due()
+    if dedup is not None:
+        # release reorder-buffered messages of devices that went quiet
+        for ready_topic, ready_payload in dedup.expire():
+            dispatch(ready_topic, ready_payload)
+        global _next_dedup_report
+        if settings.MQTT_DEDUP_REPORT_INTERVAL and time.monotonic() >= _next_dedup_report:
+            _next_dedup_report = time.monotonic() + settings.MQTT_DEDUP_REPORT_INTERVAL
+            report_dedup()
+
 def handle_message(topic, payload):
+    if dedup is None:
+        dispatch(topic, payload)
+        return
+    for ready_topic, ready_payload in dedup.process(topic, payload):
+        dispatch(ready_topic, ready_payload)
+
+def dispatch(topic, payload):
     handler = ROUTES.get(topic)
     if handler:
-        handler(payload.decode())
+        payload = payload.decode()
+        device_id, value = parse_reading(topic, payload)
+        device.registry.touch(device_id)
+        if topic in CACHED_TOPICS:
+            last_values.update(device_id, value, topic)
+        engine = rule_engines.get(topic)
+        if engine is not None:
+            engine.submit(device_id, value)
+        handler(payload)
     else:
         print(f"No handler for topic: {topic}")
-
@@ -0,0 +1,253 @@
+"""
+Declarative threshold / rate / rolling-average rules for sensor streams
+
+Rules are plain dicts, compiled once per topic:
+
+    {"name": "overheat", "field": "temperature", "type": "threshold",
+     "op": ">", "value": 30, "hysteresis": 1}
+    {"name": "fast_rise", "field": "temperature", "type": "rate", "op": ">", "value": 0.5,
+     "hysteresis": 0.4}
+    {"name": "hot_average", "field": "temperature", "type": "average", "window": 10,
+     "op": ">", "value": 28}
+
+type is "threshold" (the reading itself), "rate" (change per second since
+the previous reading of the device, "abs_rate" for its magnitude) or
+"average" (mean of the last `window` readings, undefined until full).
+A rule becomes active when the signal crosses `value` in the direction of
+`op`, and clears once it is back past `value` by more than `hysteresis`.
+Handlers only get events on those transitions. Rate signals are noisy, so
+give rate rules a hysteresis close to `value` or they flap.
+
+Rules on a field are stored as arrays, so each reading is checked against
+all of them with a handful of NumPy operations. Without NumPy the same
+arrays are walked in pure Python. Rolling averages keep a running sum per
+window over a ring buffer, so a reading costs the same for any window size.
+Readings are buffered and evaluated in micro-batches of `batch_size`, or
+once the oldest has waited `max_delay` seconds (call flush_due() from a
+timer so a quiet stream is still evaluated).
+"""
+import math
+import time
+from typing import Callable, Dict, List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SIGNALS = ('threshold', 'rate', 'abs_rate')
+OPS = {'>': 1.0, '<': -1.0}
+
+
+class Rule:
+    """One compiled rule definition"""
+    __slots__ = ('name', 'field', 'type', 'op', 'value', 'hysteresis', 'window')
+
+    def __init__(self, name: str, field: str, type: str = 'threshold', op: str = '>',
+                 value: float = 0.0, hysteresis: float = 0.0, window: int = None):
+        if type not in SIGNALS and type != 'average':
+            raise ValueError(f"Rule '{name}': unknown type '{type}'")
+        if op not in OPS:
+            raise ValueError(f"Rule '{name}': unknown op '{op}'")
+        if type == 'average' and (not window or window < 1):
+            raise ValueError(f"Rule '{name}': average rules need a window >= 1")
+        self.name = name
+        self.field = field
+        self.type = type
+        self.op = op
+        self.value = float(value)
+        self.hysteresis = float(hysteresis)
+        self.window = window
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Rule':
+        return cls(**data)
+
+
+class RuleEvent:
+    """A rule changing state for a device"""
+    __slots__ = ('rule', 'device_id', 'active', 'value', 'timestamp')
+
+    def __init__(self, rule: Rule, device_id: str, active: bool, value: float, timestamp: float):
+        self.rule = rule
+        self.device_id = device_id
+        self.active = active
+        self.value = value
+        self.timestamp = timestamp
+
+    def to_dict(self):
+        return {
+            "rule": self.rule.name,
+            "field": self.rule.field,
+            "device_id": self.device_id,
+            "state": "triggered" if self.active else "cleared",
+            "value": self.value,
+            "timestamp": self.timestamp
+        }
+
+
+class _FieldState:
+    """Per-device state for the rules on one field"""
+    __slots__ = ('active', 'prev_value', 'prev_ts', 'history', 'position', 'count', 'sums')
+
+    def __init__(self, size: int, max_window: int, windows: int):
+        self.active = np.zeros(size, dtype=bool) if np is not None else [False] * size
+        self.prev_value = None
+        self.prev_ts = None
+        # ring buffer of the last max_window readings and a running sum per window
+        self.history = [0.0] * max_window
+        self.position = 0
+        self.count = 0
+        self.sums = [0.0] * windows
+
+
+class _FieldRules:
+    """All rules on one field, as parallel arrays"""
+    def __init__(self, field: str, rules: List[Rule]):
+        self.field = field
+        self.rules = rules
+        self.windows = sorted({rule.window for rule in rules if rule.type == 'average'})
+        self.max_window = self.windows[-1] if self.windows else 0
+
+        # index of each rule's signal in [value, rate, |rate|, mean(w1), mean(w2), ...]
+        slots = {name: i for i, name in enumerate(SIGNALS)}
+        for i, window in enumerate(self.windows):
+            slots[window] = len(SIGNALS) + i
+        signal_index = [slots[rule.window if rule.type == 'average' else rule.type] for rule in rules]
+        signs = [OPS[rule.op] for rule in rules]
+        thresholds = [rule.value for rule in rules]
+        hysteresis = [rule.hysteresis for rule in rules]
+
+        if np is not None:
+            self.signal_index = np.array(signal_index, dtype=np.intp)
+            self.signs = np.array(signs)
+            self.thresholds = np.array(thresholds)
+            self.hysteresis = np.array(hysteresis)
+        else:
+            self.signal_index = signal_index
+            self.signs = signs
+            self.thresholds = thresholds
+            self.hysteresis = hysteresis
+
+    def new_state(self) -> _FieldState:
+        return _FieldState(len(self.rules), self.max_window, len(self.windows))
+
+    def signals(self, state: _FieldState, value: float, ts: float) -> list:
+        rate = math.nan
+        if state.prev_ts is not None and ts > state.prev_ts:
+            rate = (value - state.prev_value) / (ts - state.prev_ts)
+        state.prev_value = value
+        state.prev_ts = ts
+
+        signals = [value, rate, abs(rate)]
+        if self.max_window:
+            history = state.history
+            position = state.position
+            sums = state.sums
+            count = state.count
+            for j, window in enumerate(self.windows):
+                # the reading leaving this window; read before the slot is overwritten
+                if count >= window:
+                    sums[j] -= history[(position - window) % self.max_window]
+                sums[j] += value
+                signals.append(sums[j] / window if count + 1 >= window else math.nan)
+            history[position] = value
+            state.position = (position + 1) % self.max_window
+            state.count = count + 1
+        return signals
+
+    def step(self, state: _FieldState, value: float, ts: float):
+        """Advance the device state by one reading; yields (rule index, active, signal) transitions"""
+        signals = self.signals(state, value, ts)
+        if np is not None:
+            signal = np.asarray(signals)[self.signal_index]
+            distance = self.signs * (signal - self.thresholds)
+            with np.errstate(invalid='ignore'):
+                active = np.where(state.active, distance > -self.hysteresis, distance > 0)
+            # an undefined signal (first rate sample, partial window) keeps the state
+            active = np.where(np.isnan(distance), state.active, active)
+            changed = np.flatnonzero(active != state.active)
+            state.active = active
+            for i in changed:
+                yield int(i), bool(active[i]), float(signal[i])
+        else:
+            current = state.active
+            for i, slot in enumerate(self.signal_index):
+                signal = signals[slot]
+                if signal != signal:  # nan
+                    continue
+                distance = self.signs[i] * (signal - self.thresholds[i])
+                active = distance > -self.hysteresis[i] if current[i] else distance > 0
+                if active != current[i]:
+                    current[i] = active
+                    yield i, active, signal
+
+
+class RuleEngine:
+    """Evaluates compiled rules over readings and calls handlers on transitions"""
+    def __init__(self, rules: List, handlers: List[Callable[[RuleEvent], None]] = None,
+                 batch_size: int = 1, max_delay: float = 1.0):
+        rules = [rule if isinstance(rule, Rule) else Rule.from_dict(rule) for rule in rules]
+        by_field: Dict[str, List[Rule]] = {}
+        for rule in rules:
+            by_field.setdefault(rule.field, []).append(rule)
+        self.fields = {field: _FieldRules(field, field_rules) for field, field_rules in by_field.items()}
+        self.handlers = list(handlers or [])
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.pending = []
+        self._oldest = 0.0
+        self.states: Dict[str, Dict[str, _FieldState]] = {}
+        self.stats = {"readings": 0, "events": 0}
+
+    def on_event(self, handler: Callable[[RuleEvent], None]):
+        """Register an event handler (usable as a decorator)"""
+        self.handlers.append(handler)
+        return handler
+
+    def submit(self, device_id: str, reading: dict, timestamp: float = None):
+        """Queue a reading; evaluates once `batch_size` readings are pending
+        or the oldest has waited `max_delay` seconds"""
+        if not isinstance(reading, dict):
+            return
+        now = time.monotonic()
+        if not self.pending:
+            self._oldest = now
+        self.pending.append((device_id, reading, time.time() if timestamp is None else timestamp))
+        if len(self.pending) >= self.batch_size or now - self._oldest >= self.max_delay:
+            self.flush()
+
+    def flush_due(self, now: float = None) -> List[RuleEvent]:
+        """Flush if the oldest pending reading has waited `max_delay`; call from a timer"""
+        now = time.monotonic() if now is None else now
+        if self.pending and now - self._oldest >= self.max_delay:
+            return self.flush()
+        return []
+
+    def flush(self) -> List[RuleEvent]:
+        """Evaluate all pending readings in order and dispatch events"""
+        batch, self.pending = self.pending, []
+        events = []
+        for device_id, reading, ts in batch:
+            device_states = self.states.get(device_id)
+            if device_states is None:
+                device_states = self.states[device_id] = {}
+            for field, field_rules in self.fields.items():
+                value = reading.get(field)
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                state = device_states.get(field)
+                if state is None:
+                    state = device_states[field] = field_rules.new_state()
+                for i, active, signal in field_rules.step(state, float(value), ts):
+                    events.append(RuleEvent(field_rules.rules[i], device_id, active, signal, ts))
+        self.stats["readings"] += len(batch)
+        self.stats["events"] += len(events)
+
+        for event in events:
+            for handler in self.handlers:
+                try:
+                    handler(event)
+                except Exception as e:
+                    print(f"Rule handler error for {event.rule.name}: {e}")
+        return events
@@ -0,0 +1,254 @@
+"""
+Multi-process MQTT ingestion
+
+Each worker process runs its own paho client with a unique client id and
+feeds app.router.handle_message. Load is split across workers either by
+
+- MQTT v5 shared subscriptions ($share/<group>/#): the broker hands each
+  message to one member of the group, or
+- topic-hash partitioning for v3.1.1 brokers: every route topic is owned by
+  crc32(topic) % workers, and each worker only subscribes to its own topics.
+  A single hot topic then stays on one worker.
+
+Either way a device's messages can arrive at any worker, but the registry,
+the dedup/reorder stage and the rule state are per device. So every device
+is owned by one worker, crc32(device_id) % workers, and a worker that
+receives another worker's message forwards it to the owner's inbox queue.
+Each worker keeps the registry of the devices it owns under
+REGISTRY_PATH/worker-<n>; the supervisor re-splits the registry when the
+worker count changes.
+
+The supervisor restarts dead workers and aggregates their stats.
+"""
+import multiprocessing
+import os
+import queue
+import time
+import zlib
+from typing import Dict, List
+
+import paho.mqtt.client as mqtt
+from app.cache import parse_reading
+from app.handlers import device
+from app.main import run_client_loop
+from app.registry import registry_dir, repartition
+from app.router import ROUTES, handle_message
+from config.settings import (
+    MQTT_BROKER, MQTT_PORT, MQTT_CLIENT_ID, MQTT_SHARE_GROUP, MQTT_SHARED_SUBSCRIPTIONS, REGISTRY_PATH
+)
+
+STATS_INTERVAL = 5.0
+MAX_RESTART_DELAY = 30.0
+LOOP_TIMEOUT = 0.05  # seconds; forwarded messages wait at most this long
+
+
+def partition(topic: str, workers: int) -> int:
+    """Worker index owning a topic (stable across processes and restarts)"""
+    return zlib.crc32(topic.encode('utf-8')) % workers
+
+
+def device_of(topic: str, payload: bytes) -> str:
+    """Device id a message belongs to (the topic when the payload names none)"""
+    try:
+        device_id, _ = parse_reading(topic, payload.decode('utf-8'))
+    except UnicodeDecodeError:
+        return topic
+    return str(device_id)
+
+
+def worker_subscriptions(index: int, workers: int, shared: bool, group: str) -> List[str]:
+    """Topic filters a worker subscribes to"""
+    if shared:
+        return [f"$share/{group}/#"]
+    return [topic for topic in ROUTES if partition(topic, workers) == index]
+
+
+def _worker_main(index, workers, shared, group, broker, port, stats_queue, stats_interval, inboxes):
+    client_id = f"{MQTT_CLIENT_ID}-{index}-{os.getpid()}"
+    protocol = mqtt.MQTTv5 if shared else mqtt.MQTTv311
+    topics = worker_subscriptions(index, workers, shared, group)
+    counts: Dict[str, int] = {}
+    errors = 0
+    inbox = inboxes[index]
+    if REGISTRY_PATH:
+        # only the devices this worker owns, split by WorkerPool.start()
+        device.registry.reopen(registry_dir(REGISTRY_PATH, index, workers))
+
+    def handle(topic, payload):
+        nonlocal errors
+        try:
+            handle_message(topic, payload)
+        except Exception as e:
+            errors += 1
+            print(f"[worker {index}] handler error on {topic}: {e}")
+
+    def drain_inbox():
+        while True:
+            try:
+                topic, payload = inbox.get_nowait()
+            except queue.Empty:
+                return
+            handle(topic, payload)
+
+    def on_connect(client, userdata, flags, rc, properties=None):
+        print(f"[worker {index}] connected as {client_id} ({rc}), subscribing to {topics}")
+        if topics:
+            client.subscribe([(topic, 0) for topic in topics])
+
+    def on_message(client, userdata, msg):
+        counts[msg.topic] = counts.get(msg.topic, 0) + 1
+        owner = partition(device_of(msg.topic, msg.payload), workers)
+        if owner == index:
+            handle(msg.topic, msg.payload)
+        else:
+            inboxes[owner].put((msg.topic, msg.payload))
+
+    client = mqtt.Client(client_id=client_id, protocol=protocol)
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(broker, port, 60)
+
+    next_report = time.monotonic() + stats_interval
+
+    def report():
+        nonlocal counts, errors, next_report
+        if time.monotonic() >= next_report:
+            # send deltas so the supervisor can sum without double counting
+            stats_queue.put((index, counts, errors))
+            counts = {}
+            errors = 0
+            next_report = time.monotonic() + stats_interval
+
+    try:
+        run_client_loop(client, every_second=report, every_loop=drain_inbox,
+                        timeout=LOOP_TIMEOUT, name=f"[worker {index}]")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.disconnect()
+        device.registry.close()
+
+
+class WorkerPool:
+    """Starts, supervises and collects stats from ingestion workers"""
+    def __init__(self, workers: int, shared: bool = MQTT_SHARED_SUBSCRIPTIONS,
+                 group: str = MQTT_SHARE_GROUP, broker: str = MQTT_BROKER, port: int = MQTT_PORT,
+                 stats_interval: float = STATS_INTERVAL):
+        self.workers = workers
+        self.shared = shared
+        self.group = group
+        self.broker = broker
+        self.port = port
+        self.stats_interval = stats_interval
+        self.stats_queue = multiprocessing.Queue()
+        # kept across restarts so messages forwarded to a dead worker wait for it
+        self.inboxes = [multiprocessing.Queue() for _ in range(workers)]
+        self.processes: List[multiprocessing.Process] = [None] * workers
+        self.restarts = [0] * workers
+        self._restart_at = [0.0] * workers
+        self.messages = [0] * workers
+        self.errors = [0] * workers
+        self.topic_counts: Dict[str, int] = {}
+        self.started_at = None
+
+    def start(self):
+        if REGISTRY_PATH:
+            repartition(REGISTRY_PATH, self.workers, lambda device_id: partition(device_id, self.workers))
+        self.started_at = time.monotonic()
+        for index in range(self.workers):
+            self._spawn(index)
+
+    def _spawn(self, index: int):
+        process = multiprocessing.Process(
+            target=_worker_main,
+            args=(index, self.workers, self.shared, self.group, self.broker, self.port,
+                  self.stats_queue, self.stats_interval, self.inboxes),
+            name=f"mqtt-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self.processes[index] = process
+
+    def supervise(self):
+        """Restart dead workers with exponential backoff"""
+        now = time.monotonic()
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            if self._restart_at[index] == 0.0:
+                delay = min(2 ** self.restarts[index], MAX_RESTART_DELAY)
+                print(f"⚠️ worker {index} exited ({process.exitcode}), restarting in {delay}s")
+                self._restart_at[index] = now + delay
+            elif now >= self._restart_at[index]:
+                self.restarts[index] += 1
+                self._restart_at[index] = 0.0
+                self._spawn(index)
+
+    def collect(self, timeout: float = 1.0):
+        """Drain stats reports from workers"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                index, counts, errors = self.stats_queue.get(timeout=remaining)
+            except queue.Empty:
+                return
+            self.messages[index] += sum(counts.values())
+            self.errors[index] += errors
+            for topic, count in counts.items():
+                self.topic_counts[topic] = self.topic_counts.get(topic, 0) + count
+
+    def stats(self):
+        """Aggregated stats across all workers"""
+        elapsed = max(time.monotonic() - self.started_at, 1e-9) if self.started_at else 0
+        total = sum(self.messages)
+        return {
+            "mode": "shared" if self.shared else "partitioned",
+            "workers": [
+                {
+                    "index": index,
+                    "pid": process.pid if process else None,
+                    "alive": bool(process and process.is_alive()),
+                    "messages": self.messages[index],
+                    "errors": self.errors[index],
+                    "restarts": self.restarts[index]
+                }
+                for index, process in enumerate(self.processes)
+            ],
+            "messages": total,
+            "errors": sum(self.errors),
+            "msgs_per_sec": total / elapsed if elapsed else 0.0,
+            "topics": dict(self.topic_counts)
+        }
+
+    def stop(self):
+        for process in self.processes:
+            if process and process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            if process:
+                process.join(timeout=5)
+
+    def run_forever(self):
+        self.start()
+        next_print = time.monotonic() + self.stats_interval
+        try:
+            while True:
+                self.collect(timeout=1.0)
+                self.supervise()
+                if time.monotonic() >= next_print:
+                    stats = self.stats()
+                    print(f"📊 {stats['messages']} msgs ({stats['msgs_per_sec']:.1f}/s), "
+                          f"{stats['errors']} errors, "
+                          f"alive {sum(w['alive'] for w in stats['workers'])}/{self.workers}")
+                    next_print = time.monotonic() + self.stats_interval
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+def run_mqtt_workers(workers: int, shared: bool = MQTT_SHARED_SUBSCRIPTIONS):
+    WorkerPool(workers, shared=shared).run_forever()
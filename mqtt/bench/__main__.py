@@ -0,0 +1,138 @@
+"""
+MQTT ingestion benchmark
+
+Starts the stand-in broker, subscribes a paho client that feeds
+app.router.handle_message (the same path as run_mqtt_server), then runs the
+load generator and reports throughput, latency percentiles, drops and memory.
+
+    cd mqtt && python -m bench --devices 200 --rate 5 --duration 10 --qos 1
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+from app.router import handle_message
+from bench.broker import Broker
+from bench.loadgen import run_devices
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def percentiles(values, points=(50, 90, 99)):
+    if not values:
+        return {f"p{p}": None for p in points}
+    values = sorted(values)
+    last = len(values) - 1
+    return {f"p{p}": values[min(last, int(round(p / 100 * last)))] for p in points}
+
+
+def max_rss_mb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Consumer:
+    """paho subscriber timing handle_message for every message"""
+    def __init__(self, host: str, port: int, qos: int):
+        self.received = 0
+        self.handler_latency = []
+        self.end_to_end_latency = []
+        self.errors = 0
+        self.subscribed = threading.Event()
+        self.qos = qos
+        self.client = mqtt.Client(client_id="bench-consumer")
+        self.client.on_connect = self._on_connect
+        self.client.on_subscribe = self._on_subscribe
+        self.client.on_message = self._on_message
+        self.client.connect(host, port, 60)
+
+    def _on_connect(self, client, userdata, flags, rc):
+        client.subscribe("#", self.qos)
+
+    def _on_subscribe(self, client, userdata, mid, granted_qos):
+        self.subscribed.set()
+
+    def _on_message(self, client, userdata, msg):
+        start = time.perf_counter()
+        try:
+            handle_message(msg.topic, msg.payload)
+        except Exception:
+            self.errors += 1
+        self.handler_latency.append(time.perf_counter() - start)
+        self.received += 1
+        try:
+            sent_at = json.loads(msg.payload)["ts"]
+            self.end_to_end_latency.append(time.time() - sent_at)
+        except (ValueError, KeyError, TypeError):
+            pass
+
+
+async def run_benchmark(devices: int, rate: float, duration: float, qos: int, drain: float = 5.0):
+    broker = await Broker(port=0).start()
+    consumer = Consumer("127.0.0.1", broker.port, qos)
+    consumer.client.loop_start()
+    await asyncio.get_running_loop().run_in_executor(None, consumer.subscribed.wait, 5)
+
+    rss_before = max_rss_mb()
+    start = time.monotonic()
+    simulated = await run_devices("127.0.0.1", broker.port, devices, rate, duration, qos)
+    sent = sum(device.sent for device in simulated)
+
+    # give the consumer time to catch up with what is still in flight
+    deadline = time.monotonic() + drain
+    while consumer.received < sent and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.monotonic() - start
+
+    consumer.client.loop_stop()
+    consumer.client.disconnect()
+    await broker.stop()
+
+    return {
+        "devices": devices,
+        "rate_per_device": rate,
+        "qos": qos,
+        "duration_s": round(elapsed, 3),
+        "sent": sent,
+        "received": consumer.received,
+        "dropped": sent - consumer.received,
+        "broker_dropped": broker.stats["dropped"],
+        "connect_failures": sum(device.failed for device in simulated),
+        "handler_errors": consumer.errors,
+        "msgs_per_sec": round(consumer.received / elapsed, 1) if elapsed else 0.0,
+        "handler_latency_ms": {k: v and round(v * 1000, 3) for k, v in percentiles(consumer.handler_latency).items()},
+        "end_to_end_latency_ms": {k: v and round(v * 1000, 3) for k, v in percentiles(consumer.end_to_end_latency).items()},
+        "max_rss_mb": max_rss_mb(),
+        "max_rss_before_mb": rss_before
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MQTT ingestion benchmark")
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=1.0, help="messages per second per device")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--qos", type=int, choices=(0, 1), default=0)
+    parser.add_argument("--verbose", action="store_true", help="keep handler output")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            devnull = stack.enter_context(open(os.devnull, 'w'))
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        report = asyncio.run(run_benchmark(args.devices, args.rate, args.duration, args.qos))
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
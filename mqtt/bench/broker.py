@@ -0,0 +1,232 @@
+"""
+Minimal asyncio MQTT 3.1.1 broker stand-in for benchmarks and local testing
+
+    python -m bench.broker --port 1883
+"""
+import asyncio
+import struct
+from typing import Dict, List, Optional, Tuple
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """MQTT wildcard match ('+' single level, '#' multi level)"""
+    if topic_filter == '#':
+        return not topic.startswith('$')
+    filter_parts = topic_filter.split('/')
+    topic_parts = topic.split('/')
+    for i, part in enumerate(filter_parts):
+        if part == '#':
+            return True
+        if i >= len(topic_parts):
+            return False
+        if part != '+' and part != topic_parts[i]:
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+
+def encode_remaining_length(length: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        out.append(byte)
+        if not length:
+            return bytes(out)
+
+
+def encode_string(value: str) -> bytes:
+    data = value.encode('utf-8')
+    return struct.pack('!H', len(data)) + data
+
+
+def packet(packet_type: int, flags: int, body: bytes) -> bytes:
+    return bytes([(packet_type << 4) | flags]) + encode_remaining_length(len(body)) + body
+
+
+def publish_packet(topic: str, payload: bytes, qos: int = 0, packet_id: int = 0,
+                   retain: bool = False) -> bytes:
+    flags = (qos << 1) | (1 if retain else 0)
+    body = encode_string(topic)
+    if qos:
+        body += struct.pack('!H', packet_id)
+    return packet(PUBLISH, flags, body + payload)
+
+
+async def read_packet(reader: asyncio.StreamReader) -> Tuple[int, int, bytes]:
+    """Read one packet, returns (type, flags, body)"""
+    header = await reader.readexactly(1)
+    multiplier, length = 1, 0
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        length += (byte & 0x7F) * multiplier
+        if not byte & 0x80:
+            break
+        multiplier *= 128
+    body = await reader.readexactly(length) if length else b''
+    return header[0] >> 4, header[0] & 0x0F, body
+
+
+class Session:
+    """One connected client"""
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.client_id = ""
+        self.subscriptions: Dict[str, int] = {}
+        self._packet_id = 0
+
+    def next_packet_id(self) -> int:
+        self._packet_id = self._packet_id % 65535 + 1
+        return self._packet_id
+
+
+class Broker:
+    """Minimal MQTT 3.1.1 broker: CONNECT, SUBSCRIBE, PUBLISH QoS 0/1, PING.
+
+    Meant for local benchmarks and tests, not production. There is no
+    persistence, no retained messages, no QoS 1 redelivery and no auth.
+    Messages are dropped for subscribers whose write buffer exceeds
+    `max_buffer` bytes.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 1883, max_buffer: int = 4 * 1024 * 1024):
+        self.host = host
+        self.port = port
+        self.max_buffer = max_buffer
+        self.sessions: List[Session] = []
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.stats = {"received": 0, "delivered": 0, "dropped": 0, "clients": 0}
+        self._tasks = set()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle_client(self, reader, writer):
+        session = Session(writer)
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            packet_type, _, body = await read_packet(reader)
+            if packet_type != CONNECT:
+                return
+            session.client_id = self._parse_connect(body)
+            writer.write(packet(CONNACK, 0, b'\x00\x00'))
+            self.sessions.append(session)
+            self.stats["clients"] += 1
+
+            while True:
+                packet_type, flags, body = await read_packet(reader)
+                if packet_type == PUBLISH:
+                    self._on_publish(session, flags, body)
+                elif packet_type == SUBSCRIBE:
+                    self._on_subscribe(session, body)
+                elif packet_type == UNSUBSCRIBE:
+                    self._on_unsubscribe(session, body)
+                elif packet_type == PINGREQ:
+                    writer.write(packet(PINGRESP, 0, b''))
+                elif packet_type == DISCONNECT:
+                    break
+                # PUBACK from subscribers needs no action without redelivery
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._tasks.discard(task)
+            if session in self.sessions:
+                self.sessions.remove(session)
+                self.stats["clients"] -= 1
+            writer.close()
+
+    def _parse_connect(self, body: bytes) -> str:
+        # protocol name, level, flags, keepalive, then client id
+        name_len = struct.unpack('!H', body[:2])[0]
+        offset = 2 + name_len + 4
+        id_len = struct.unpack('!H', body[offset:offset + 2])[0]
+        return body[offset + 2:offset + 2 + id_len].decode('utf-8')
+
+    def _on_publish(self, session: Session, flags: int, body: bytes):
+        qos = (flags >> 1) & 0x03
+        topic_len = struct.unpack('!H', body[:2])[0]
+        topic = body[2:2 + topic_len].decode('utf-8')
+        offset = 2 + topic_len
+        if qos:
+            packet_id = body[offset:offset + 2]
+            offset += 2
+            session.writer.write(packet(PUBACK, 0, packet_id))
+        payload = body[offset:]
+        self.stats["received"] += 1
+
+        for subscriber in self.sessions:
+            sub_qos = self._match(subscriber, topic)
+            if sub_qos is None:
+                continue
+            transport = subscriber.writer.transport
+            if transport.get_write_buffer_size() > self.max_buffer:
+                self.stats["dropped"] += 1
+                continue
+            out_qos = min(qos, sub_qos)
+            packet_id = subscriber.next_packet_id() if out_qos else 0
+            subscriber.writer.write(publish_packet(topic, payload, out_qos, packet_id))
+            self.stats["delivered"] += 1
+
+    def _match(self, session: Session, topic: str) -> Optional[int]:
+        best = None
+        for topic_filter, qos in session.subscriptions.items():
+            if topic_matches(topic_filter, topic) and (best is None or qos > best):
+                best = qos
+        return best
+
+    def _on_subscribe(self, session: Session, body: bytes):
+        packet_id = body[:2]
+        offset = 2
+        granted = bytearray()
+        while offset < len(body):
+            length = struct.unpack('!H', body[offset:offset + 2])[0]
+            topic_filter = body[offset + 2:offset + 2 + length].decode('utf-8')
+            qos = min(body[offset + 2 + length] & 0x03, 1)
+            offset += 3 + length
+            session.subscriptions[topic_filter] = qos
+            granted.append(qos)
+        session.writer.write(packet(SUBACK, 0, packet_id + bytes(granted)))
+
+    def _on_unsubscribe(self, session: Session, body: bytes):
+        packet_id = body[:2]
+        offset = 2
+        while offset < len(body):
+            length = struct.unpack('!H', body[offset:offset + 2])[0]
+            session.subscriptions.pop(body[offset + 2:offset + 2 + length].decode('utf-8'), None)
+            offset += 2 + length
+        session.writer.write(packet(UNSUBACK, 0, packet_id))
+
+
+async def _serve(host: str, port: int):
+    broker = await Broker(host, port).start()
+    print(f"📡 Stand-in broker listening on {host}:{broker.port}")
+    await broker.server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Minimal MQTT 3.1.1 broker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n🛑 Broker stopped.")
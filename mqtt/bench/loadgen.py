@@ -0,0 +1,91 @@
+"""
+Load generator simulating ESP32-style devices
+
+Each device is an asyncio task with its own MQTT connection publishing
+{"device_id": ..., "temperature": ..., "seq": ..., "ts": ...} at a fixed rate.
+"ts" is the send time, used for end-to-end latency.
+"""
+import asyncio
+import json
+import random
+import struct
+import time
+from typing import List
+
+from bench.broker import CONNECT, CONNACK, PUBACK, DISCONNECT, encode_string, packet, publish_packet, read_packet
+
+
+def connect_packet(client_id: str, keepalive: int = 60) -> bytes:
+    body = encode_string("MQTT") + bytes([4, 0x02]) + struct.pack('!H', keepalive) + encode_string(client_id)
+    return packet(CONNECT, 0, body)
+
+
+class SimulatedDevice:
+    """One device publishing temperature readings"""
+    def __init__(self, device_id: str, topic: str = "sensor/temperature", rate: float = 1.0, qos: int = 0):
+        self.device_id = device_id
+        self.topic = topic
+        self.interval = 1.0 / rate
+        self.qos = qos
+        self.sent = 0
+        self.acked = 0
+        self.failed = 0
+
+    def payload(self) -> bytes:
+        return json.dumps({
+            "device_id": self.device_id,
+            "temperature": random.randint(200, 350) / 10.0,
+            "seq": self.sent,
+            "ts": time.time()
+        }).encode('utf-8')
+
+    async def run(self, host: str, port: int, duration: float):
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            self.failed += 1
+            return
+        writer.write(connect_packet(self.device_id))
+        packet_type, _, _ = await read_packet(reader)
+        if packet_type != CONNACK:
+            writer.close()
+            self.failed += 1
+            return
+
+        ack_task = asyncio.create_task(self._read_acks(reader))
+        # spread devices over the first interval so they don't publish in lockstep
+        await asyncio.sleep(random.random() * self.interval)
+        start = time.monotonic()
+        next_send = start
+        try:
+            while time.monotonic() - start < duration:
+                packet_id = self.sent % 65535 + 1 if self.qos else 0
+                writer.write(publish_packet(self.topic, self.payload(), self.qos, packet_id))
+                self.sent += 1
+                await writer.drain()
+                next_send += self.interval
+                await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+            writer.write(packet(DISCONNECT, 0, b''))
+            await writer.drain()
+        except ConnectionError:
+            self.failed += 1
+        finally:
+            ack_task.cancel()
+            writer.close()
+
+    async def _read_acks(self, reader):
+        try:
+            while True:
+                packet_type, _, _ = await read_packet(reader)
+                if packet_type == PUBACK:
+                    self.acked += 1
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+
+async def run_devices(host: str, port: int, count: int, rate: float, duration: float,
+                      qos: int = 0, topic: str = "sensor/temperature") -> List[SimulatedDevice]:
+    """Run `count` devices publishing `rate` msgs/s each for `duration` seconds"""
+    devices = [SimulatedDevice(f"esp32-{i:05d}", topic, rate, qos) for i in range(count)]
+    await asyncio.gather(*(device.run(host, port, duration) for device in devices))
+    return devices
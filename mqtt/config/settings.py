@@ -1,2 +1,54 @@
+import os
+
 MQTT_BROKER = "localhost"
 MQTT_PORT = 1883
+
+# Multi-worker ingestion (see app/workers.py)
+MQTT_CLIENT_ID = "pyro-ingest"
+MQTT_WORKERS = 1
+MQTT_SHARE_GROUP = "ingest"
+MQTT_SHARED_SUBSCRIPTIONS = True  # needs an MQTT v5 broker; False partitions topics by hash
+
+# Duplicate suppression for QoS 1 retransmissions (see app/dedup.py)
+# Payloads with a "seq" field are keyed by (topic, device, seq) and remembered
+# for MQTT_DEDUP_WINDOW to 2x MQTT_DEDUP_WINDOW seconds (two bloom generations).
+# Payloads without one are keyed by their hash for MQTT_DEDUP_HASH_WINDOW only:
+# an identical reading sent again within that window is dropped as a
+# retransmission, so keep it below the shortest interval at which a device
+# may legitimately repeat a payload (the ESP32 example publishes every 5 s).
+# A bloom false positive also drops a genuine message (MQTT_DEDUP_ERROR_RATE).
+MQTT_DEDUP = False
+MQTT_DEDUP_WINDOW = 60.0          # seconds a sequence key is remembered (at least)
+MQTT_DEDUP_HASH_WINDOW = 2.0      # seconds a payload hash is remembered, 0 disables
+MQTT_DEDUP_CAPACITY = 100_000     # keys per window
+MQTT_DEDUP_ERROR_RATE = 0.001     # bloom filter false positive rate
+MQTT_DEDUP_MAX_BYTES = None       # memory cap for both key stores, shrinks capacity if set
+MQTT_DEDUP_EXACT = False          # LRU set instead of bloom filters
+MQTT_REORDER_SIZE = 0             # per-device reorder buffer, 0 disables
+MQTT_REORDER_TIMEOUT = 1.0
+MQTT_DEDUP_REPORT_INTERVAL = 60.0 # seconds between suppressed-count log lines, 0 disables
+
+# Alert rules per topic (see app/rules.py), events go to handlers/alerts.py.
+# Rate rules see every bit of sensor noise: set their value above the noise
+# (the ESP32 example jumps by up to 3 degrees between readings) and a hysteresis.
+# MQTT_RULES = {
+#     "sensor/temperature": [
+#         {"name": "overheat", "field": "temperature", "type": "threshold", "op": ">", "value": 33.0, "hysteresis": 1.0},
+#         {"name": "fast_rise", "field": "temperature", "type": "rate", "op": ">", "value": 0.5, "hysteresis": 0.4},
+#         {"name": "hot_average", "field": "temperature", "type": "average", "window": 10, "op": ">", "value": 30.0},
+#     ],
+# }
+MQTT_RULES = {}
+MQTT_RULE_BATCH_SIZE = 1          # readings evaluated together
+MQTT_RULE_MAX_DELAY = 1.0         # seconds a reading may wait for its batch
+
+# Device registry (see app/registry.py)
+# snapshot + log directory, None keeps it in memory. With MQTT_WORKERS > 1 every
+# device is owned by one worker (crc32 of its id) and messages are forwarded to
+# the owner, so registry, dedup and rule state stay whole per device. Each worker
+# stores its devices in REGISTRY_PATH/worker-<n>; the registry is re-split on
+# startup when MQTT_WORKERS changes. Lookups (get/find) in one worker only see
+# the devices it owns
+REGISTRY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+DEVICE_OFFLINE_AFTER = 300.0          # seconds without messages before a device is offline
+REGISTRY_SNAPSHOT_INTERVAL = 600.0
@@ -1,4 +1,13 @@
-from app.main import run_mqtt_server
+from config.settings import MQTT_WORKERS, REGISTRY_PATH
 
 if __name__ == "__main__":
-    run_mqtt_server()
+    if MQTT_WORKERS > 1:
+        from app.workers import run_mqtt_workers
+        run_mqtt_workers(MQTT_WORKERS)
+    else:
+        if REGISTRY_PATH:
+            # take back devices left in worker directories by a multi-worker run
+            from app.registry import repartition
+            repartition(REGISTRY_PATH, 1)
+        from app.main import run_mqtt_server
+        run_mqtt_server()
@@ -0,0 +1,27 @@
+from app.dedup import Deduplicator, ReorderBuffer
+
+
+def test_reorder_expire_releases_every_waiting_message():
+    buffer = ReorderBuffer(size=8, timeout=1.0)
+    assert buffer.push("d", 1, "s1", now=0.0) == ["s1"]
+    assert buffer.push("d", 5, "s5", now=0.0) == []
+    assert buffer.push("d", 3, "s3", now=0.5) == []
+
+    released = buffer.expire(1.0) + buffer.expire(1.5) + buffer.expire(100.0)
+    assert released == ["s3", "s5"]
+    assert not buffer._pending
+
+
+def test_reorder_expire_rearms_when_oldest_not_due():
+    buffer = ReorderBuffer(size=8, timeout=1.0)
+    buffer.push("d", 1, "s1", now=0.0)
+    buffer.push("d", 3, "s3", now=0.0)
+    assert buffer.expire(1.0) == ["s3"]
+    buffer.push("d", 6, "s6", now=1.2)
+    assert buffer.expire(1.5) == []
+    assert buffer.expire(2.2) == ["s6"]
+
+
+def test_max_bytes_is_shared_by_both_key_stores():
+    dedup = Deduplicator(max_bytes=10_000, exact=True, hash_window=2.0)
+    assert dedup.seen_keys.max_items + dedup.seen_hashes.max_items <= 10_000 // 100